@@ -0,0 +1,147 @@
+"""Compare prompt size and latency of retrieved knowledge against the full prompt.
+
+Usage (from the repository root):
+
+    python -m benchmarks.knowledge_prompt --character NeuronLinkEnthusiast
+    python -m benchmarks.knowledge_prompt --knowledge-dir path/to/docs --live
+
+Without --live only local work is measured: prompt tokens (estimated the
+same way as the prompt budget does), index build time and retrieval time.
+With --live each prompt is also sent to the character's model and the
+end-to-end generation latency is reported.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from dotenv import dotenv_values
+from loguru import logger
+
+from core.character_manager import CharacterManager
+from core.knowledge import KnowledgeBase
+from core.prompt_budget import estimate_tokens
+from core.types import Settings
+
+DEFAULT_QUERIES = [
+    "Does anyone know a tool that can run terminal commands for me?",
+    "Which AI models can I plug into my editor?",
+    "Is there something that automates browser actions while coding?",
+    "lol my build broke again",
+    "What's the best way to learn Rust in 2025?",
+    "Can an assistant read and write files in my project?",
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def build_prompts(persona: str, knowledge: KnowledgeBase, query: str):
+    full = f"\n{persona}\n\n{knowledge.full_text()}\n\nMessage: '{query}'\n\nReply:"
+    context = knowledge.context_for(query)
+    block = f"\n{context}\n" if context else ""
+    retrieved = f"\n{persona}\n{block}\nMessage: '{query}'\n\nReply:"
+    return full, retrieved
+
+
+async def measure_live(generation_manager, prompts: List[str]) -> List[float]:
+    latencies = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        await generation_manager.generate_text(prompt)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def measure_live_both(character: Dict, settings: Settings, provider: str, full_prompts: List[str],
+                            retrieved_prompts: List[str]) -> Tuple[List[float], List[float]]:
+    """Time both prompt sets on one loop; the manager's HTTP client is bound to the loop it first runs on"""
+    # Imported here so the offline measurements don't need the provider SDKs
+    from core.generation import GenerationManager
+    generation_manager = GenerationManager(
+        model_provider=provider,
+        base_url=character.get("baseUrl") or settings.ollama.base_url,
+        default_model=character.get("model") or settings.ollama.model,
+        api_key=settings.gemini.api_key,
+    )
+    full_latency = await measure_live(generation_manager, full_prompts)
+    retrieved_latency = await measure_live(generation_manager, retrieved_prompts)
+    return full_latency, retrieved_latency
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--character", default="NeuronLinkEnthusiast")
+    parser.add_argument("--knowledge-dir", help="Override the character's knowledge_dir")
+    parser.add_argument("--queries", help="File with one query per line")
+    parser.add_argument("--iterations", type=int, default=200, help="Retrieval timing iterations per query")
+    parser.add_argument("--live", action="store_true", help="Also measure generation latency against the model")
+    args = parser.parse_args()
+
+    for key, value in dotenv_values(".env").items():
+        if value is not None:
+            os.environ[key] = value
+    settings = Settings.from_env()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    character = CharacterManager().get_character(args.character)
+    if not character:
+        sys.exit(f"Unknown character: {args.character}")
+    knowledge_dir = args.knowledge_dir or character.get("knowledge_dir")
+    if not knowledge_dir:
+        sys.exit(f"{args.character} has no knowledge_dir; pass --knowledge-dir")
+    with open(character["prompt_file"], 'r') as f:
+        persona = f.read()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, 'r') as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    # Cold build without the on-disk cache, then a warm load through it
+    cold_settings = settings.knowledge.model_copy(update={"index_dir": ""})
+    start = time.perf_counter()
+    knowledge = KnowledgeBase(knowledge_dir, cold_settings)
+    cold_ms = (time.perf_counter() - start) * 1000
+    KnowledgeBase(knowledge_dir, settings.knowledge)  # Make sure the cache exists
+    start = time.perf_counter()
+    knowledge = KnowledgeBase(knowledge_dir, settings.knowledge)
+    warm_ms = (time.perf_counter() - start) * 1000
+
+    provider = character.get("modelProvider", "ollama")
+    full_tokens, retrieved_tokens, retrieval_ms = [], [], []
+    full_prompts, retrieved_prompts = [], []
+    for query in queries:
+        full, retrieved = build_prompts(persona, knowledge, query)
+        full_prompts.append(full)
+        retrieved_prompts.append(retrieved)
+        full_tokens.append(estimate_tokens(full, provider))
+        retrieved_tokens.append(estimate_tokens(retrieved, provider))
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            knowledge.context_for(query)
+            retrieval_ms.append((time.perf_counter() - start) * 1000)
+
+    print(f"Character: {args.character}  knowledge: {knowledge_dir}  chunks: {len(knowledge.chunks)}  queries: {len(queries)}")
+    print(f"Index build: cold {cold_ms:.1f}ms, cached {warm_ms:.1f}ms")
+    print(f"Retrieval:   p50 {percentile(retrieval_ms, 0.5):.3f}ms, p99 {percentile(retrieval_ms, 0.99):.3f}ms")
+    print(f"Prompt tokens (full prompt):  avg {statistics.mean(full_tokens):.0f}, max {max(full_tokens)}")
+    print(f"Prompt tokens (retrieval):    avg {statistics.mean(retrieved_tokens):.0f}, max {max(retrieved_tokens)}")
+    print(f"Reduction: {1 - sum(retrieved_tokens) / sum(full_tokens):.1%}")
+
+    if args.live:
+        full_latency, retrieved_latency = asyncio.run(
+            measure_live_both(character, settings, provider, full_prompts, retrieved_prompts)
+        )
+        print(f"Generation latency (full prompt): p50 {percentile(full_latency, 0.5):.2f}s, max {max(full_latency):.2f}s")
+        print(f"Generation latency (retrieval):   p50 {percentile(retrieved_latency, 0.5):.2f}s, max {max(retrieved_latency):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Load test the client stack against an in-memory platform.
+
+Usage (from the repository root):
+
+    python -m benchmarks.platform_load --chats 20 --rate 0.5 --duration 30
+    python -m benchmarks.platform_load --hot-chats 2 --hot-multiplier 20 --typing-scale 0
+    python -m benchmarks.platform_load --chats 5 --rate 0.1 --live
+
+Synthetic messages are posted to a SimulatedPlatform and dispatched
+through SimulatedClient, SimulatedMessageManager and the real
+MessageHandler. Replies are captured when they are delivered. By default
+the model is SimulatedBackend, so the numbers reflect the scheduling,
+typing and send paths without a model. With --live the character's real
+model is used instead.
+
+Reported: offered load (messages posted per second of traffic),
+throughput (messages the client finished handling, replied, skipped or
+answered with marketing text, per second of the run), end-to-end reply
+latency (inbound message to delivered reply, p50/p99/max; marketing sends
+are counted separately and excluded), and Jain's fairness index across chats.
+The index is 1.0 when every chat gets the same value and 1/n when one
+chat gets everything.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from dotenv import dotenv_values
+from loguru import logger
+
+from core.character_manager import CharacterManager
+from core.concurrency import get_limiter
+from core.types import Settings
+from core.usage import usage
+from clients.simulated.client import SimulatedClient
+from clients.simulated.generation import SimulatedBackend, SimulatedGenerationManager
+from clients.simulated.platform import SimulatedPlatform, TrafficProfile
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def jain_index(values: List[float]) -> float:
+    """Jain's fairness index: (sum x)^2 / (n * sum x^2)"""
+    squares = sum(v * v for v in values)
+    return sum(values) ** 2 / (len(values) * squares) if squares else 1.0
+
+
+async def run(args, character: Dict, settings: Settings) -> None:
+    platform = SimulatedPlatform(typing_scale=args.typing_scale)
+    if args.live:
+        generation_manager = None  # MessageHandler builds the character's real one
+    else:
+        limiter = get_limiter("simulated", settings.concurrency) if settings.concurrency.enabled else None
+        backend = SimulatedBackend(
+            relevance_rate=args.relevance_rate, decode_tokens_per_second=args.decode_rate,
+            parallelism=args.parallelism, seed=args.seed,
+        )
+        generation_manager = SimulatedGenerationManager(backend, limiter=limiter, character_name=character["name"])
+    client = SimulatedClient(character, settings, platform, generation_manager)
+    profile = TrafficProfile(
+        chats=args.chats, rate=args.rate, burst_probability=args.burst_probability, burst_size=args.burst_size,
+        hot_chats=args.hot_chats, hot_multiplier=args.hot_multiplier, duration_seconds=args.duration,
+    )
+
+    start = time.monotonic()
+    await asyncio.gather(client.start(), platform.run_traffic(profile, seed=args.seed))
+    elapsed = time.monotonic() - start
+
+    received_per_chat: Dict[int, int] = defaultdict(int)
+    for message in platform.received:
+        received_per_chat[message.chat_id] += 1
+    latencies_per_chat: Dict[int, List[float]] = defaultdict(list)
+    for sent in platform.sent:
+        if sent.latency is not None:
+            latencies_per_chat[sent.chat_id].append(sent.latency)
+    latencies = [latency for chat in latencies_per_chat.values() for latency in chat]
+    outcomes = platform.outcomes
+    handled = outcomes["replied"] + outcomes["skipped"] + outcomes["marketing"]
+    marketing = sum(1 for sent in platform.sent if sent.marketing)
+
+    print(f"Character: {character['name']}  backend: {'live' if args.live else 'simulated'}  chats: {args.chats}  "
+          f"rate: {args.rate}/s per chat  duration: {args.duration:.0f}s  typing scale: {args.typing_scale}")
+    print(f"Messages posted: {len(platform.received)}  replies delivered: {len(latencies)}  "
+          f"marketing sends: {marketing}  other sends: {len(platform.sent) - len(latencies) - marketing}  "
+          f"elapsed: {elapsed:.1f}s")
+    print(f"Offered load: {len(platform.received) / args.duration:.2f} msg/s")
+    print(f"Throughput: {handled / elapsed:.2f} msg/s handled ({outcomes['replied']} replied, {outcomes['skipped']} skipped, "
+          f"{outcomes['marketing']} marketing, {outcomes['failed']} failed), {len(latencies) / elapsed:.2f} replies/s")
+    if not latencies:
+        print("No replies were delivered")
+        return
+    print(f"Reply latency: p50 {percentile(latencies, 0.5):.2f}s, p99 {percentile(latencies, 0.99):.2f}s, "
+          f"max {max(latencies):.2f}s (typing {platform.typing_seconds / len(platform.sent):.2f}s per send)")
+
+    chats = sorted(received_per_chat)
+    reply_ratios = [len(latencies_per_chat[chat]) / received_per_chat[chat] for chat in chats]
+    mean_latencies = [statistics.mean(latencies_per_chat[chat]) for chat in chats if latencies_per_chat[chat]]
+    print(f"Fairness (Jain): reply ratio {jain_index(reply_ratios):.3f}, mean latency {jain_index(mean_latencies):.3f}")
+    if args.hot_chats:
+        hot = [latency for chat in chats if chat <= args.hot_chats for latency in latencies_per_chat[chat]]
+        cold = [latency for chat in chats if chat > args.hot_chats for latency in latencies_per_chat[chat]]
+        if hot and cold:
+            print(f"Hot chats p50 {percentile(hot, 0.5):.2f}s / p99 {percentile(hot, 0.99):.2f}s, "
+                  f"other chats p50 {percentile(cold, 0.5):.2f}s / p99 {percentile(cold, 0.99):.2f}s")
+    for line in usage.summary_lines(settings.usage.prices):
+        print(f"Usage: {line}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--character", default="NeuronLinkEnthusiast")
+    parser.add_argument("--chats", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=0.2, help="Mean messages per second per chat")
+    parser.add_argument("--burst-probability", type=float, default=0.05)
+    parser.add_argument("--burst-size", type=int, default=5)
+    parser.add_argument("--hot-chats", type=int, default=0, help="Chats whose rate is multiplied by --hot-multiplier")
+    parser.add_argument("--hot-multiplier", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of traffic")
+    parser.add_argument("--typing-scale", type=float, default=1.0, help="Multiplier on simulated typing time (0 skips it)")
+    parser.add_argument("--parallelism", type=int, default=4, help="Simulated backend slots")
+    parser.add_argument("--decode-rate", type=float, default=50.0, help="Simulated backend output tokens per second")
+    parser.add_argument("--relevance-rate", type=float, default=0.7, help="Share of messages the simulated backend finds relevant")
+    parser.add_argument("--no-marketing", action="store_true", help="Disable marketing messages for the run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--live", action="store_true", help="Use the character's real model instead of the simulated backend")
+    args = parser.parse_args()
+
+    for key, value in dotenv_values(".env").items():
+        if value is not None:
+            os.environ[key] = value
+    settings = Settings.from_env()
+    if args.no_marketing:
+        settings = settings.model_copy(update={"enable_marketing": False})
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    character = CharacterManager().get_character(args.character)
+    if not character:
+        sys.exit(f"Unknown character: {args.character}")
+    if not args.live:
+        # The semantic cache embeds through a real Ollama server
+        character = {**character, "semanticCache": False}
+
+    asyncio.run(run(args, character, settings))
+
+
+if __name__ == "__main__":
+    main()
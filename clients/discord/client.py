@@ -1,13 +1,15 @@
 import discord
 from loguru import logger
 from core.generation import GenerationManager
+from core.types import Settings
 from .message_manager import DiscordMessageManager
 
 class DiscordClient(discord.Client):
-    def __init__(self, character: dict):
+    def __init__(self, character: dict, settings: Settings, generation_manager: GenerationManager = None):
         super().__init__()
         self.message_manager = DiscordMessageManager(
-            runtime={"character": character, "prompt_file": character.get("prompt_file")}
+            runtime={"character": character, "prompt_file": character.get("prompt_file"), "settings": settings,
+                     "generation_manager": generation_manager}
         )
 
     async def on_ready(self):
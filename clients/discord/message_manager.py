@@ -5,7 +5,9 @@ import asyncio
 
 class DiscordMessageManager:
     def __init__(self, runtime: dict):
-        self.message_handler = MessageHandler(runtime["prompt_file"], runtime["character"])
+        self.message_handler = MessageHandler(
+            runtime["prompt_file"], runtime["character"], runtime["settings"], runtime.get("generation_manager")
+        )
         self.client = None
 
     async def _send_with_typing(self, message: discord.Message, content: str) -> None:
@@ -31,7 +33,7 @@ class DiscordMessageManager:
                 return
 
             # Get response from message handler
-            response = await self.message_handler.handle_message(content)
+            response = await self.message_handler.handle_message(content, chat_id=message.channel.id)
             if response and not response.startswith("Error:"):
                 await self._send_with_typing(message, response)
 
@@ -0,0 +1,31 @@
+import asyncio
+from typing import Set
+from loguru import logger
+from core.generation import GenerationManager
+from core.types import Settings
+from .message_manager import SimulatedMessageManager
+from .platform import SimulatedPlatform
+
+
+class SimulatedClient:
+    def __init__(self, character: dict, settings: Settings, platform: SimulatedPlatform,
+                 generation_manager: GenerationManager = None):
+        self.platform = platform
+        self.message_manager = SimulatedMessageManager(
+            runtime={"character": character, "prompt_file": character.get("prompt_file"), "settings": settings,
+                     "generation_manager": generation_manager, "platform": platform}
+        )
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def start(self):
+        """Dispatch inbound messages until the platform closes, then wait for in-flight handlers"""
+        logger.info("Started simulated client")
+        while True:
+            event = await self.platform.inbound.get()
+            if event is None:
+                break
+            # One task per event, as Telethon and discord.py dispatch their handlers
+            task = asyncio.create_task(self.message_manager.handle_message(event))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        await asyncio.gather(*self.tasks)
@@ -0,0 +1,69 @@
+import asyncio
+import random
+from typing import Optional
+from core.generation import GenerationManager
+from core.prompt_budget import estimate_tokens
+from core.types import GenerationResult
+
+RELEVANCE_MARKER = "Answer with 'yes' or 'no'"
+
+
+class SimulatedBackend:
+    """Offline model backend with a local-server-like latency profile.
+
+    Each call takes a fixed overhead plus prefill time proportional to the
+    prompt and decode time proportional to the output, and at most
+    `parallelism` calls run at once, so queueing behaves like a model server
+    with a fixed number of slots. Relevance checks answer yes with
+    probability relevance_rate.
+    """
+
+    def __init__(self, relevance_rate: float = 0.7, overhead_seconds: float = 0.05, prefill_tokens_per_second: float = 2000,
+                 decode_tokens_per_second: float = 50, reply_tokens: int = 30, parallelism: int = 4, seed: Optional[int] = None):
+        self.relevance_rate = relevance_rate
+        self.overhead = overhead_seconds
+        self.prefill_rate = prefill_tokens_per_second
+        self.decode_rate = decode_tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.slots = asyncio.Semaphore(parallelism)
+        self.random = random.Random(seed)
+
+    async def generate(self, context: str, model: str = None, personality: str = "") -> GenerationResult:
+        relevance = RELEVANCE_MARKER in context
+        prompt_tokens = estimate_tokens(context)
+        completion_tokens = 2 if relevance else self.reply_tokens
+        prompt_eval = prompt_tokens / self.prefill_rate
+        eval_seconds = completion_tokens / self.decode_rate
+        async with self.slots:
+            await asyncio.sleep(self.overhead + prompt_eval + eval_seconds)
+
+        if relevance:
+            text = f"{'yes' if self.random.random() < self.relevance_rate else 'no'} 0.9"
+        else:
+            text = " ".join(["simulated"] * completion_tokens)
+        return GenerationResult(
+            text=text,
+            provider="simulated",
+            model=model or "simulated",
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            prompt_eval_seconds=prompt_eval,
+            eval_seconds=eval_seconds,
+        )
+
+    async def generate_text(self, context: str, model: str = None, personality: str = "") -> str:
+        return (await self.generate(context, model, personality)).text
+
+    async def generate_marketing_message(self, template: str, character_name: str) -> str:
+        return await self.generate_text(template)
+
+
+class SimulatedGenerationManager(GenerationManager):
+    """GenerationManager backed by SimulatedBackend; limiter, usage and caching work as usual"""
+
+    def __init__(self, backend: SimulatedBackend, limiter=None, character_name: str = ""):
+        self.backend = backend
+        super().__init__(model_provider="simulated", default_model="simulated", limiter=limiter, character_name=character_name)
+
+    def _initialize_generator(self):
+        return self.backend
@@ -0,0 +1,49 @@
+from loguru import logger
+from clients.base import BaseMessageManager
+from core.message_handler import MessageHandler
+from .platform import SimulatedMessage
+
+
+class SimulatedMessageManager(BaseMessageManager):
+    def __init__(self, runtime: dict):
+        self.message_handler = MessageHandler(
+            runtime["prompt_file"], runtime["character"], runtime["settings"], runtime.get("generation_manager")
+        )
+        super().__init__(runtime, self.message_handler.generation_manager)
+        self.platform = runtime["platform"]
+
+    async def _send_with_typing(self, event: SimulatedMessage, message: str, marketing: bool = False) -> None:
+        """Send a message with typing animation"""
+        try:
+            # Same typing model as the real clients (50ms per character, max 10 seconds)
+            typing_duration = min(len(message) * 0.05, 10)
+            await self.platform.typing(event.chat_id, typing_duration)
+            await self.platform.send(event.chat_id, message, reply_to=event, marketing=marketing)
+        except Exception as e:
+            logger.error(f"Error sending message: {e}")
+
+    async def handle_message(self, event: SimulatedMessage) -> None:
+        outcome = "skipped"
+        try:
+            if event.out or not event.text:
+                return
+
+            response, marketing = await self.message_handler.respond(event.text, chat_id=event.chat_id)
+            if response and not response.startswith("Error:"):
+                await self._send_with_typing(event, response, marketing)
+                outcome = "marketing" if marketing else "replied"
+
+        except Exception as e:
+            outcome = "failed"
+            logger.error(f"Error handling simulated message: {e}")
+        finally:
+            self.platform.finish(event, outcome)
+
+    async def send_marketing_message(self, chat_id: int) -> None:
+        try:
+            message = await self.message_handler.marketing_manager.generate_marketing_message()
+            if message and not message.startswith("Error:"):
+                await self.platform.typing(chat_id, min(len(message) * 0.05, 10))
+                await self.platform.send(chat_id, message)
+        except Exception as e:
+            logger.error(f"Error sending marketing message: {e}")
@@ -0,0 +1,132 @@
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+from typing import List, Optional
+from loguru import logger
+from pydantic import BaseModel, Field
+
+WORDS = (
+    "anyone know how to fix this build error in rust python typescript go docker kubernetes "
+    "my editor keeps crashing when i open large files is there an ai tool that can write tests "
+    "refactor code run terminal commands read the project structure deploy to production today "
+    "lol coffee weekend meeting standup deadline bug feature release branch merge conflict review"
+).split()
+
+
+class TrafficProfile(BaseModel):
+    """Shape of the synthetic traffic posted by SimulatedPlatform.run_traffic"""
+    chats: int = Field(10, ge=1)
+    rate: float = Field(0.2, gt=0)  # Mean messages per second per chat (Poisson arrivals)
+    burst_probability: float = Field(0.05, ge=0, le=1)  # Chance an arrival is a burst of burst_size messages
+    burst_size: int = Field(5, ge=1)
+    hot_chats: int = Field(0, ge=0)  # Chats whose rate is multiplied by hot_multiplier
+    hot_multiplier: float = Field(10.0, ge=1)
+    duration_seconds: float = Field(30.0, gt=0)
+    min_words: int = Field(4, ge=1)
+    max_words: int = Field(16, ge=1)
+
+
+class SimulatedMessage:
+    """An inbound message, shaped like the events the platform clients receive"""
+    __slots__ = ("chat_id", "message_id", "text", "created_at", "out")
+
+    def __init__(self, chat_id: int, message_id: int, text: str, created_at: float):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.text = text
+        self.created_at = created_at
+        self.out = False
+
+
+class SentMessage:
+    """An outgoing message captured by the platform"""
+    __slots__ = ("chat_id", "text", "reply_to", "sent_at", "marketing")
+
+    def __init__(self, chat_id: int, text: str, reply_to: Optional[SimulatedMessage], sent_at: float,
+                 marketing: bool = False):
+        self.chat_id = chat_id
+        self.text = text
+        self.reply_to = reply_to
+        self.sent_at = sent_at
+        self.marketing = marketing
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Seconds from the inbound message arriving to this reply being delivered; None for marketing sends"""
+        return self.sent_at - self.reply_to.created_at if self.reply_to and not self.marketing else None
+
+
+class SimulatedPlatform:
+    """In-memory chat platform for exercising the client stack offline.
+
+    Inbound messages are queued for a SimulatedClient to dispatch; sends are
+    captured with monotonic timestamps so end-to-end latency can be measured,
+    and the client reports how each inbound message ended (replied, skipped,
+    marketing or failed) so throughput counts finished work rather than arrivals.
+    Marketing text sent in response to a message is tagged and kept out of
+    reply latency.
+    Typing indicators sleep for typing_scale times the requested duration,
+    so runs can be time-compressed (0 skips typing entirely).
+    """
+
+    def __init__(self, typing_scale: float = 1.0):
+        self.typing_scale = typing_scale
+        self.inbound: asyncio.Queue = asyncio.Queue()
+        self.received: List[SimulatedMessage] = []
+        self.sent: List[SentMessage] = []
+        self.typing_seconds = 0.0
+        self.outcomes: Counter = Counter()
+        self.ids = itertools.count(1)
+
+    def post(self, chat_id: int, text: str) -> SimulatedMessage:
+        message = SimulatedMessage(chat_id, next(self.ids), text, time.monotonic())
+        self.received.append(message)
+        self.inbound.put_nowait(message)
+        return message
+
+    async def typing(self, chat_id: int, seconds: float) -> None:
+        seconds *= self.typing_scale
+        self.typing_seconds += seconds
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    async def send(self, chat_id: int, text: str, reply_to: Optional[SimulatedMessage] = None,
+                   marketing: bool = False) -> SentMessage:
+        sent = SentMessage(chat_id, text, reply_to, time.monotonic(), marketing)
+        self.sent.append(sent)
+        return sent
+
+    def finish(self, message: SimulatedMessage, outcome: str) -> None:
+        """Record that the client finished handling an inbound message"""
+        self.outcomes[outcome] += 1
+
+    def close(self) -> None:
+        """Tell the client no more messages will arrive"""
+        self.inbound.put_nowait(None)
+
+    async def run_traffic(self, profile: TrafficProfile, seed: Optional[int] = None) -> None:
+        """Post synthetic messages to every chat for the profile's duration, then close"""
+        rng = random.Random(seed)
+        deadline = time.monotonic() + profile.duration_seconds
+        tasks = []
+        for chat_id in range(1, profile.chats + 1):
+            rate = profile.rate * (profile.hot_multiplier if chat_id <= profile.hot_chats else 1)
+            # Each chat gets its own generator so chats stay independent of scheduling order
+            tasks.append(asyncio.create_task(self._chat_traffic(chat_id, rate, profile, random.Random(rng.random()), deadline)))
+        await asyncio.gather(*tasks)
+        logger.info(f"Simulated traffic finished: {len(self.received)} messages across {profile.chats} chats")
+        self.close()
+
+    async def _chat_traffic(self, chat_id: int, rate: float, profile: TrafficProfile, rng: random.Random,
+                            deadline: float) -> None:
+        while True:
+            delay = rng.expovariate(rate)
+            if time.monotonic() + delay >= deadline:
+                return
+            await asyncio.sleep(delay)
+            count = profile.burst_size if rng.random() < profile.burst_probability else 1
+            for _ in range(count):
+                words = rng.randint(profile.min_words, max(profile.min_words, profile.max_words))
+                self.post(chat_id, " ".join(rng.choice(WORDS) for _ in range(words)))
@@ -2,24 +2,27 @@ from telethon import TelegramClient
 from telethon.events import NewMessage
 from telethon.tl.types import Channel, Chat
 from core.generation import GenerationManager
+from core.types import Settings
 from .message_manager import TelegramMessageManager
 import os
 from loguru import logger
 
 class TelegramUserClient:
-    def __init__(self, character: dict):
+    def __init__(self, character: dict, settings: Settings, generation_manager: GenerationManager = None):
         # Initialize Telegram client with user credentials
-        self.api_id = int(os.getenv('TELEGRAM_API_ID'))
-        self.api_hash = os.getenv('TELEGRAM_API_HASH')
-        self.phone = os.getenv('TELEGRAM_PHONE')
+        self.settings = settings.telegram
+        if not (self.settings.api_id or "").isdigit():
+            raise ValueError(f"TELEGRAM_API_ID must be the numeric API id for the Telegram client, got {self.settings.api_id!r}")
+        self.api_id = int(self.settings.api_id)
+        self.api_hash = self.settings.api_hash
+        self.phone = self.settings.phone
         
         # Set up session in the sessions directory
         os.makedirs('sessions', exist_ok=True)
-        session_path = os.path.join('sessions', 'user_session')
+        session_path = os.path.join('sessions', self.settings.session_name)
         
         # Get allowed chats
-        self.allowed_groups = os.getenv('TELEGRAM_ALLOWED_GROUPS', '').split(',')
-        self.allowed_groups = [g.strip() for g in self.allowed_groups if g.strip()]
+        self.allowed_groups = self.settings.allowed_groups
         self.allowed_chat_ids = set()
         
         # Initialize client and message manager
@@ -31,20 +34,21 @@ class TelegramUserClient:
         )
         
         self.message_manager = TelegramMessageManager(
-            runtime={"character": character, "prompt_file": character.get("prompt_file")}
+            runtime={"character": character, "prompt_file": character.get("prompt_file"), "settings": settings,
+                     "generation_manager": generation_manager}
         )
 
     def _get_proxy_config(self):
-        host = os.getenv('TELEGRAM_PROXY_HOST')
+        host = self.settings.proxy_host
         if not host:
             return None
             
         return {
             'proxy_type': 'socks5',
             'addr': host,
-            'port': int(os.getenv('TELEGRAM_PROXY_PORT', '1080')),
-            'username': os.getenv('TELEGRAM_PROXY_USERNAME'),
-            'password': os.getenv('TELEGRAM_PROXY_PASSWORD')
+            'port': self.settings.proxy_port,
+            'username': self.settings.proxy_username,
+            'password': self.settings.proxy_password
         }
 
     async def _resolve_allowed_chats(self):
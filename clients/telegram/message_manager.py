@@ -8,7 +8,9 @@ from datetime import datetime
 
 class TelegramMessageManager:
     def __init__(self, runtime: dict):
-        self.message_handler = MessageHandler(runtime["prompt_file"], runtime["character"])
+        self.message_handler = MessageHandler(
+            runtime["prompt_file"], runtime["character"], runtime["settings"], runtime.get("generation_manager")
+        )
         os.makedirs('logs', exist_ok=True)
         self.log_file = open('logs/telegram_log.json', 'a')
 
@@ -35,7 +37,7 @@ class TelegramMessageManager:
                 return
 
             # Get response from message handler
-            response = await self.message_handler.handle_message(message)
+            response = await self.message_handler.handle_message(message, chat_id=event.chat_id)
             if response and not response.startswith("Error:"):
                 await self._send_with_typing(event, response)
                 self.log_reply(message, response)
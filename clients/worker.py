@@ -0,0 +1,55 @@
+import asyncio
+from typing import Dict
+from loguru import logger
+from core.character_manager import PromptWatcher
+from core.generation_service import RemoteGenerationManager
+from core.process import run_child_process
+from core.types import Settings
+
+
+def run_platform_worker(platform: str, character: Dict, settings: Settings) -> None:
+    """Process entry point for one platform client in multi-process mode"""
+    run_child_process(settings, lambda stop: _run_worker(platform, character, settings, stop))
+
+
+async def _run_worker(platform: str, character: Dict, settings: Settings, stop: asyncio.Event) -> None:
+    generation_manager = RemoteGenerationManager(settings.multiprocess, character)
+    # Imported here so each worker only loads its own platform library; main.py, which spawn
+    # re-imports in every child, imports neither at module level
+    if platform == "telegram":
+        from clients.telegram.client import TelegramUserClient
+        client = TelegramUserClient(character=character, settings=settings, generation_manager=generation_manager)
+        client_task = asyncio.create_task(client.start())
+    elif platform == "discord":
+        from clients.discord.client import DiscordClient
+        client = DiscordClient(character=character, settings=settings, generation_manager=generation_manager)
+        client_task = asyncio.create_task(client.start(settings.discord.token))
+    else:
+        raise ValueError(f"Unsupported platform: {platform}")
+    logger.info(f"{platform} worker started for {character['name']}")
+
+    watcher = None
+    if settings.prompt_reload.enabled:
+        handler = client.message_manager.message_handler
+        watcher = PromptWatcher(settings.prompt_reload.interval_seconds)
+        watcher.watch(handler.prompt_file, handler.update_prompt)
+        watcher.start()
+
+    stop_task = asyncio.create_task(stop.wait())
+    try:
+        await asyncio.wait({client_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+        if client_task.done():
+            # Raises the client's error; a clean return means the connection dropped
+            client_task.result()
+            raise RuntimeError(f"{platform} client disconnected")
+    finally:
+        stop_task.cancel()
+        if watcher:
+            watcher.stop()
+        if platform == "telegram":
+            await client.client.disconnect()
+        else:
+            await client.close()
+        client_task.cancel()
+        await generation_manager.close()
+        logger.info(f"{platform} worker stopped")
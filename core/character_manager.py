@@ -1,9 +1,14 @@
+import asyncio
 import os
 import json
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from loguru import logger
+from pydantic import ValidationError
+from .types import Character
 
 class CharacterManager:
+    """Registry of character templates, validated against the Character model"""
+
     def __init__(self, templates_dir: str = "characters/templates"):
         self.templates_dir = templates_dir
         self.characters: Dict[str, Dict] = {}
@@ -14,18 +19,29 @@ class CharacterManager:
         if not os.path.exists(self.templates_dir):
             logger.error(f"Templates directory not found: {self.templates_dir}")
             return
-            
-        for filename in os.listdir(self.templates_dir):
+
+        for filename in sorted(os.listdir(self.templates_dir)):
             if filename.endswith('.json'):
-                try:
-                    filepath = os.path.join(self.templates_dir, filename)
-                    with open(filepath, 'r') as f:
-                        character = json.load(f)
-                        name = character.get('name')
-                        if name:
-                            self.characters[name] = character
-                except Exception as e:
-                    logger.error(f"Error loading character from {filename}: {e}")
+                character = self._load_template(os.path.join(self.templates_dir, filename))
+                if character:
+                    self.characters[character['name']] = character
+
+    def _load_template(self, filepath: str) -> Optional[Dict]:
+        """Parse and validate a template; invalid templates are logged and skipped"""
+        try:
+            with open(filepath, 'r') as f:
+                character = Character.model_validate(json.load(f)).model_dump(exclude_none=True)
+        except ValidationError as e:
+            logger.error(f"Invalid character template {os.path.basename(filepath)}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error loading character from {os.path.basename(filepath)}: {e}")
+            return None
+
+        if not os.path.exists(character['prompt_file']):
+            logger.error(f"Prompt file for {character['name']} not found: {character['prompt_file']}")
+            return None
+        return character
     
     def get_character_names(self) -> List[str]:
         """Get list of available character names"""
@@ -77,3 +93,64 @@ class CharacterManager:
             except KeyboardInterrupt:
                 print("\nCharacter selection cancelled.")
                 return None
+
+
+class PromptWatcher:
+    """Polls prompt files and pushes changed content into running handlers.
+
+    Handlers are registered with a callback that receives the new prompt
+    content; the callback swaps it in and drops prompt-dependent caches.
+    """
+
+    def __init__(self, interval_seconds: float = 2.0):
+        self.interval = interval_seconds
+        self.watched: Dict[str, List[Callable[[str], None]]] = {}
+        self.mtimes: Dict[str, float] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    def watch(self, prompt_file: str, on_change: Callable[[str], None]) -> None:
+        self.watched.setdefault(prompt_file, []).append(on_change)
+        try:
+            self.mtimes.setdefault(prompt_file, os.path.getmtime(prompt_file))
+        except OSError:
+            self.mtimes.setdefault(prompt_file, 0.0)
+
+    def start(self) -> None:
+        if self.watched and self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Watching {len(self.watched)} prompt file(s) for changes")
+
+    def stop(self) -> None:
+        if self.task and not self.task.done():
+            self.task.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            for prompt_file in list(self.watched):
+                try:
+                    await self._check(prompt_file)
+                except Exception as e:
+                    logger.error(f"Error reloading prompt file {prompt_file}: {e}")
+
+    async def _check(self, prompt_file: str) -> None:
+        try:
+            mtime = os.path.getmtime(prompt_file)
+        except OSError:
+            return  # File is being replaced; check again next round
+        if mtime == self.mtimes.get(prompt_file):
+            return
+
+        content = await asyncio.to_thread(_read_file, prompt_file)
+        if not content.strip():
+            # Editors may truncate before writing; keep the old prompt until content appears
+            return
+        self.mtimes[prompt_file] = mtime
+        for on_change in self.watched[prompt_file]:
+            on_change(content)
+        logger.info(f"Reloaded prompt file {prompt_file} ({len(content)} chars)")
+
+
+def _read_file(path: str) -> str:
+    with open(path, 'r') as f:
+        return f.read()
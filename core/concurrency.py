@@ -0,0 +1,109 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from loguru import logger
+from .metrics import metrics
+from .types import ConcurrencySettings
+
+LONG_RTT_WINDOW = 100  # Samples averaged into the baseline latency
+DROP_BACKOFF = 0.9  # Multiplier applied to the limit when a call fails
+
+
+class AdaptiveConcurrencyLimiter:
+    """Concurrency limit for LLM calls that adapts to observed latency.
+
+    Follows the gradient approach: the ratio of the long-term baseline latency
+    to the latest latency estimates how much queueing the backend is doing.
+    While latency stays at the baseline the limit grows by about sqrt(limit);
+    when latency rises the limit shrinks proportionally. Failed calls cut the
+    limit multiplicatively.
+
+    Calls to one backend differ widely in cost (a one-token triage answer vs a
+    full reply, a small vs a large model), so a baseline is kept per key and
+    each call is compared against calls of its own kind.
+    """
+
+    def __init__(self, settings: ConcurrencySettings, name: str = "llm"):
+        self.name = name
+        self.limit = float(settings.initial_limit)
+        self.min_limit = settings.min_limit
+        self.max_limit = settings.max_limit
+        self.smoothing = settings.smoothing
+        self.in_flight = 0
+        self.long_rtt: Dict[str, float] = {}  # Baseline latency per key (model and call type)
+        self.waiters: Deque[asyncio.Future] = deque()
+        metrics.set_gauge("llm_concurrency_limit", self.limit, backend=self.name)
+        logger.info(f"Initialized adaptive concurrency limiter '{name}' (initial={settings.initial_limit}, "
+                    f"min={self.min_limit}, max={self.max_limit})")
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        start = time.monotonic()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # We were handed a slot just before being cancelled; pass it on
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self.waiters.remove(waiter)
+            raise
+        metrics.observe("llm_queue_wait_seconds", time.monotonic() - start, backend=self.name)
+
+    def release(self, rtt: Optional[float], success: bool = True, key: str = "default") -> None:
+        """Release a slot and update the limit from the call's latency; rtt None releases without a sample"""
+        in_flight = self.in_flight
+        self.in_flight -= 1
+        if not success:
+            self._set_limit(self.limit * DROP_BACKOFF)
+        elif rtt is not None and rtt > 0:
+            self._update(rtt, in_flight, key)
+        self._wake()
+
+    def _update(self, rtt: float, in_flight: int, key: str) -> None:
+        long_rtt = self.long_rtt.get(key)
+        if long_rtt is None:
+            self.long_rtt[key] = rtt
+            return
+        long_rtt += (rtt - long_rtt) / LONG_RTT_WINDOW
+        # Let the baseline recover quickly once latency drops back down
+        if long_rtt > rtt * 2:
+            long_rtt = rtt
+        self.long_rtt[key] = long_rtt
+
+        gradient = max(0.5, min(1.0, long_rtt / rtt))
+        # Only grow if the limit was actually being used; an idle limiter learns nothing about capacity
+        queue_size = math.sqrt(self.limit) if in_flight * 2 >= self.limit else 0.0
+        new_limit = self.limit * gradient + queue_size
+        self._set_limit(self.limit * (1 - self.smoothing) + new_limit * self.smoothing)
+
+    def _set_limit(self, limit: float) -> None:
+        self.limit = max(float(self.min_limit), min(float(self.max_limit), limit))
+        metrics.set_gauge("llm_concurrency_limit", self.limit, backend=self.name)
+
+    def _wake(self) -> None:
+        while self.waiters and self.in_flight < int(self.limit):
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+        metrics.set_gauge("llm_in_flight", self.in_flight, backend=self.name)
+
+
+_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+
+
+def get_limiter(key: str, settings: ConcurrencySettings) -> AdaptiveConcurrencyLimiter:
+    """Return the limiter shared by every caller of the same backend"""
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = _limiters[key] = AdaptiveConcurrencyLimiter(settings, name=key)
+    return limiter
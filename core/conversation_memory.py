@@ -0,0 +1,214 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Iterator, List, Optional
+from loguru import logger
+from .generation import GenerationManager
+from .prompt_budget import estimate_tokens
+from .types import MemorySettings
+
+USER_ROLE = "user"
+ASSISTANT_ROLE = "assistant"
+
+
+class Turn:
+    """A single message in a chat history"""
+    __slots__ = ("role", "text", "timestamp", "tokens")
+
+    def __init__(self, role: str, text: str, timestamp: float):
+        self.role = role
+        self.text = text
+        self.timestamp = timestamp
+        self.tokens = estimate_tokens(text)
+
+    def render(self) -> str:
+        speaker = "You" if self.role == ASSISTANT_ROLE else "User"
+        return f"{speaker}: {self.text}"
+
+
+class RingBuffer:
+    """Fixed-capacity buffer that overwrites its oldest item when full"""
+    __slots__ = ("_items", "_capacity", "_start", "_size")
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("RingBuffer capacity must be positive")
+        self._items: List[Any] = [None] * capacity
+        self._capacity = capacity
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, item: Any) -> Optional[Any]:
+        """Append an item, returning the evicted item if the buffer was full"""
+        if self._size < self._capacity:
+            self._items[(self._start + self._size) % self._capacity] = item
+            self._size += 1
+            return None
+
+        evicted = self._items[self._start]
+        self._items[self._start] = item
+        self._start = (self._start + 1) % self._capacity
+        return evicted
+
+    def __iter__(self) -> Iterator[Any]:
+        """Iterate from oldest to newest"""
+        for i in range(self._size):
+            yield self._items[(self._start + i) % self._capacity]
+
+    def newest_first(self) -> Iterator[Any]:
+        """Iterate from newest to oldest"""
+        for i in range(self._size - 1, -1, -1):
+            yield self._items[(self._start + i) % self._capacity]
+
+
+class ChatHistory:
+    """Bounded history of a single chat: recent turns plus a rolling summary"""
+    __slots__ = ("turns", "summary", "pending", "last_active", "summary_task")
+
+    def __init__(self, capacity: int):
+        self.turns = RingBuffer(capacity)
+        self.summary = ""
+        self.pending: List[Turn] = []  # Evicted turns waiting to be folded into the summary
+        self.last_active = time.monotonic()
+        self.summary_task: Optional[asyncio.Task] = None
+
+
+class ConversationMemory:
+    """Per-chat conversation memory with bounded size and idle-chat eviction.
+
+    Each chat keeps its most recent turns in a ring buffer. Turns pushed out of
+    the buffer are folded into a rolling summary by a background task, so the
+    message path never waits on summarization.
+    """
+
+    def __init__(self, generation_manager: GenerationManager, settings: MemorySettings):
+        self.generation_manager = generation_manager
+        self.turns_per_chat = settings.turns_per_chat
+        self.max_chats = settings.max_chats
+        self.idle_ttl = settings.idle_ttl_hours * 3600
+        self.context_tokens = settings.context_tokens
+        self.summary_batch = settings.summary_batch
+        self.summary_max_chars = settings.summary_max_chars
+        # Pending turns beyond this are dropped so a stalled summarizer cannot grow memory
+        self.max_pending = self.summary_batch * 4
+        self.chats: "OrderedDict[Any, ChatHistory]" = OrderedDict()
+
+        logger.info(f"Initialized ConversationMemory: turns_per_chat={self.turns_per_chat}, max_chats={self.max_chats}, "
+                    f"idle_ttl={settings.idle_ttl_hours}h, context_tokens={self.context_tokens}")
+
+    def _get_chat(self, chat_id: Any) -> ChatHistory:
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = ChatHistory(self.turns_per_chat)
+            self.chats[chat_id] = chat
+        else:
+            self.chats.move_to_end(chat_id)
+        chat.last_active = time.monotonic()
+        return chat
+
+    def record(self, chat_id: Any, role: str, text: str) -> None:
+        """Record a message in the chat history"""
+        if not text:
+            return
+
+        chat = self._get_chat(chat_id)
+        evicted = chat.turns.append(Turn(role, text, time.time()))
+        if evicted is not None:
+            chat.pending.append(evicted)
+            if len(chat.pending) > self.max_pending:
+                del chat.pending[:len(chat.pending) - self.max_pending]
+            if len(chat.pending) >= self.summary_batch:
+                self._schedule_summary(chat_id, chat)
+
+        self.evict_idle()
+
+    def build_context(self, chat_id: Any, max_tokens: Optional[int] = None) -> str:
+        """Assemble the summary and the most recent turns that fit in the token budget"""
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            return ""
+
+        budget = self.context_tokens if max_tokens is None else max_tokens
+        summary = ""
+        if chat.summary:
+            summary_tokens = estimate_tokens(chat.summary)
+            # The summary never takes more than half of the budget
+            if summary_tokens <= budget // 2:
+                summary = chat.summary
+                budget -= summary_tokens
+
+        lines: List[str] = []
+        for turn in chat.turns.newest_first():
+            if turn.tokens > budget:
+                break
+            budget -= turn.tokens
+            lines.append(turn.render())
+        lines.reverse()
+
+        parts = []
+        if summary:
+            parts.append(f"Summary of earlier conversation: {summary}")
+        if lines:
+            parts.append("\n".join(lines))
+        return "\n\n".join(parts)
+
+    def evict_idle(self) -> None:
+        """Drop chats that are idle for too long or exceed the chat limit"""
+        now = time.monotonic()
+        while self.chats:
+            chat_id, chat = next(iter(self.chats.items()))
+            if len(self.chats) <= self.max_chats and now - chat.last_active < self.idle_ttl:
+                break
+            self.chats.popitem(last=False)
+            if chat.summary_task and not chat.summary_task.done():
+                chat.summary_task.cancel()
+            logger.debug("Evicted conversation memory for chat {}", chat_id)
+
+    def _schedule_summary(self, chat_id: Any, chat: ChatHistory) -> None:
+        if chat.summary_task and not chat.summary_task.done():
+            return
+        try:
+            chat.summary_task = asyncio.get_running_loop().create_task(self._update_summary(chat_id, chat))
+        except RuntimeError:
+            # No running loop (e.g. called from sync code); try again on the next eviction
+            pass
+
+    async def _update_summary(self, chat_id: Any, chat: ChatHistory) -> None:
+        """Fold pending evicted turns into the chat's rolling summary"""
+        # Take the batch out before awaiting; record() may trim or extend pending in the meantime
+        batch, chat.pending = chat.pending, []
+        if not batch:
+            return
+
+        try:
+            transcript = "\n".join(turn.render() for turn in batch)
+            prompt = f"""
+Current summary of the conversation:
+{chat.summary or '(empty)'}
+
+New messages:
+{transcript}
+
+Update the summary to include the new messages. Keep only facts, names and open questions that matter for future replies. Answer with the summary only, in at most {self.summary_max_chars} characters.
+"""
+            response = await self.generation_manager.generate_text(prompt, call_type="summary")
+            if not response or response.startswith("[INTERNAL]"):
+                logger.error(f"Failed to update conversation summary for chat {chat_id}: {response}")
+                self._restore_pending(chat, batch)
+                return
+
+            chat.summary = response.strip()[:self.summary_max_chars]
+            logger.debug("Updated summary for chat {} ({} chars)", chat_id, len(chat.summary))
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error updating conversation summary: {e}")
+            self._restore_pending(chat, batch)
+
+    def _restore_pending(self, chat: ChatHistory, batch: List[Turn]) -> None:
+        """Put an unsummarized batch back ahead of turns evicted since, keeping the newest max_pending"""
+        chat.pending = (batch + chat.pending)[-self.max_pending:]
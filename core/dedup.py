@@ -0,0 +1,181 @@
+import random
+import re
+import time
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+from loguru import logger
+from .metrics import metrics
+from .types import DedupSettings
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; signatures are then computed in Python over fewer characters
+    np = None
+
+NUM_PERM = 64  # MinHash signature length
+BANDS = 16  # LSH bands; rows per band = NUM_PERM // BANDS
+SHINGLE_SIZE = 5  # Character shingle length
+MIN_WORDS = 3  # Shorter messages ("hi", a bare link or emoji) are too generic to deduplicate
+MAX_CHARS = 2000 if np is not None else 250  # Only the start of long messages is shingled
+
+_MERSENNE_PRIME = (1 << 31) - 1  # Small enough that a * h + b fits in 64 bits
+_rng = random.Random(1729)  # Fixed seed so signatures are stable across restarts
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+if np is not None:
+    _A = np.array([a for a, _ in _PERMUTATIONS], dtype=np.uint64)[:, None]
+    _B = np.array([b for _, b in _PERMUTATIONS], dtype=np.uint64)[:, None]
+
+URL_RE = re.compile(r"(https?://|www\.)\S+")
+MENTION_RE = re.compile(r"@\w+")
+NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+Signature = Tuple[int, ...]
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip links, mentions, emoji and punctuation"""
+    text = URL_RE.sub(" ", text.lower())
+    text = MENTION_RE.sub(" ", text)
+    return NON_WORD_RE.sub(" ", text).strip()
+
+
+@lru_cache(maxsize=512)
+def signature(text: str) -> Optional[Signature]:
+    """MinHash signature of the normalized text's character shingles, or None if it has under MIN_WORDS words"""
+    normalized = normalize(text[:MAX_CHARS])
+    if len(normalized.split()) < MIN_WORDS:
+        return None
+    shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(max(1, len(normalized) - SHINGLE_SIZE + 1))}
+    hashes = [zlib.crc32(s.encode()) % _MERSENNE_PRIME for s in shingles]
+    if np is not None:
+        # All permutations of all shingle hashes at once: (NUM_PERM, shingles)
+        permuted = (_A * np.array(hashes, dtype=np.uint64) + _B) % _MERSENNE_PRIME
+        return tuple(int(v) for v in permuted.min(axis=1))
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class DedupEntry:
+    """Verdicts recorded for a judged message"""
+    __slots__ = ("relevant", "reply", "created")
+
+    def __init__(self, relevant: bool, created: float):
+        self.relevant = relevant
+        self.reply: Optional[str] = None
+        self.created = created
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index of judged messages, bounded by entry count and age.
+
+    Messages whose estimated similarity to an indexed message reaches the
+    threshold reuse its relevance verdict (and optionally its reply) instead
+    of calling the LLM again.
+    """
+
+    def __init__(self, settings: DedupSettings, name: str = "default"):
+        self.threshold = settings.threshold
+        self.max_entries = settings.max_entries
+        self.ttl = settings.ttl_hours * 3600
+        self.name = name
+        self.rows = NUM_PERM // BANDS
+        self.entries: "OrderedDict[Signature, DedupEntry]" = OrderedDict()
+        self.buckets: Dict[Tuple[int, Signature], Set[Signature]] = {}
+        self.lookups = 0
+        self.hits = 0
+        logger.info(f"Initialized NearDuplicateIndex '{name}' (threshold={self.threshold}, max_entries={self.max_entries}, "
+                    f"ttl={settings.ttl_hours}h)")
+
+    def _band_keys(self, sig: Signature) -> List[Tuple[int, Signature]]:
+        return [(band, sig[band * self.rows:(band + 1) * self.rows]) for band in range(BANDS)]
+
+    def match(self, text: str) -> Optional[DedupEntry]:
+        """Return the entry of the most similar indexed message above the threshold"""
+        self._expire()
+        self.lookups += 1
+        metrics.inc("dedup_lookups_total", index=self.name)
+
+        sig = signature(text)
+        if sig is None:
+            metrics.set_gauge("dedup_hit_rate", self.hit_rate, index=self.name)
+            return None
+        best: Optional[DedupEntry] = None
+        best_score = 0.0
+        candidates: Set[Signature] = set()
+        for key in self._band_keys(sig):
+            candidates.update(self.buckets.get(key, ()))
+        for candidate in candidates:
+            score = similarity(sig, candidate)
+            if score >= self.threshold and score > best_score:
+                best, best_score = self.entries[candidate], score
+
+        if best is not None:
+            self.hits += 1
+            metrics.inc("dedup_hits_total", index=self.name)
+            logger.debug("Near-duplicate message found (similarity {:.2f} >= threshold {:.2f}, hit rate {:.1%})",
+                         best_score, self.threshold, self.hit_rate)
+        metrics.set_gauge("dedup_hit_rate", self.hit_rate, index=self.name)
+        return best
+
+    def add(self, text: str, relevant: bool) -> Optional[DedupEntry]:
+        """Index a message with its relevance verdict; messages too short to match are skipped"""
+        sig = signature(text)
+        if sig is None:
+            return None
+        entry = self.entries.get(sig)
+        if entry is not None:
+            entry.relevant = relevant
+            return entry
+
+        entry = self.entries[sig] = DedupEntry(relevant, time.monotonic())
+        for key in self._band_keys(sig):
+            self.buckets.setdefault(key, set()).add(sig)
+        while len(self.entries) > self.max_entries:
+            self._remove_oldest()
+        return entry
+
+    def set_reply(self, text: str, reply: str) -> None:
+        """Attach the reply generated for an indexed message"""
+        sig = signature(text)
+        entry = self.entries.get(sig) if sig is not None else None
+        if entry is not None:
+            entry.reply = reply
+
+    def clear(self) -> None:
+        """Forget all verdicts, e.g. after the prompt they were judged against changed"""
+        self.entries.clear()
+        self.buckets.clear()
+        logger.debug("Cleared near-duplicate index '{}'", self.name)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "threshold": self.threshold,
+            "entries": len(self.entries),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate,
+        }
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        while self.entries and next(iter(self.entries.values())).created < cutoff:
+            self._remove_oldest()
+
+    def _remove_oldest(self) -> None:
+        sig, _ = self.entries.popitem(last=False)
+        for key in self._band_keys(sig):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(sig)
+                if not bucket:
+                    del self.buckets[key]
@@ -6,6 +6,11 @@ import os
 import google.generativeai as genai
 import time
 import asyncio
+from .concurrency import get_limiter
+from .types import GenerationResult, Settings
+from .usage import usage
+
+NANOSECONDS = 1e9
 
 
 class GeminiGenerationManager:
@@ -16,12 +21,18 @@ class GeminiGenerationManager:
         genai.configure(api_key=self.api_key)
         self.default_model = default_model
         self.model = genai.GenerativeModel(self.default_model)
+        self.models: Dict[str, Any] = {self.default_model: self.model}
         self.last_request_time = 0
         self.rate_limit_delay = 2  # seconds
         logger.info(f"Initializing GeminiGenerationManager with default model: {self.default_model}")
 
     async def generate_text(self, context: str, model: str = None, personality: str = "") -> str:
         """Generate text using the specified Gemini model."""
+        return (await self.generate(context, model, personality)).text
+
+    async def generate(self, context: str, model: str = None, personality: str = "") -> GenerationResult:
+        """Generate text with the token counts reported in the response's usage metadata"""
+        model_name = model or self.default_model
         try:
             # Apply rate limiting
             current_time = time.time()
@@ -31,38 +42,55 @@ class GeminiGenerationManager:
                 logger.info(f"Applying rate limit. Delaying for {delay:.2f} seconds.")
                 await asyncio.sleep(delay)
 
-            logger.debug(f"Starting Gemini text generation process with model: {model or self.default_model}")
+            logger.debug("Starting Gemini text generation process with model: {}", model_name)
 
             # Incorporate personality into the context
             if personality:
                 context = f"Personality: {personality}\n\n{context}"
 
-            chat = self.model.start_chat()
+            chat = self._get_model(model).start_chat()
 
             response = await chat.send_message_async(context)
             self.last_request_time = time.time()  # Update last request time
 
 
+            usage_metadata = getattr(response, "usage_metadata", None)
+            result = GenerationResult(
+                text="",
+                provider="gemini",
+                model=model_name,
+                prompt_tokens=getattr(usage_metadata, "prompt_token_count", None),
+                completion_tokens=getattr(usage_metadata, "candidates_token_count", None),
+            )
             if response.text:
-                generated_text = response.text.strip()
-                logger.debug(f"Successfully generated {len(generated_text)} characters")
-                return generated_text
+                result.text = response.text.strip()
+                logger.debug("Successfully generated {} characters", len(result.text))
             else:
                 logger.error("Gemini generation failed: No text returned")
-                return "[INTERNAL] Gemini generation failed: No text returned"
+                result.text = "[INTERNAL] Gemini generation failed: No text returned"
+            return result
 
         except Exception as e:
             logger.error(f"Unexpected error during Gemini generation: {str(e)}")
-            return f"[INTERNAL] An unexpected error occurred with Gemini: {str(e)}"
+            return GenerationResult(
+                text=f"[INTERNAL] An unexpected error occurred with Gemini: {str(e)}", provider="gemini", model=model_name
+            )
+
+    def _get_model(self, model: str = None):
+        """Get a cached GenerativeModel for the requested model name"""
+        name = model or self.default_model
+        if name not in self.models:
+            self.models[name] = genai.GenerativeModel(name)
+        return self.models[name]
 
     async def generate_marketing_message(self, template: str, character_name: str) -> str:
         """Generate a marketing message using the template with Gemini."""
         try:
-            logger.debug(f"Generating Gemini marketing message for character: {character_name}")
+            logger.debug("Generating Gemini marketing message for character: {}", character_name)
             response = await self.generate_text(template)
             if not response.startswith("[INTERNAL]"):
                 cleaned_response = response.strip().strip('"\'')
-                logger.debug(f"Generated Gemini marketing message of length {len(cleaned_response)}")
+                logger.debug("Generated Gemini marketing message of length {}", len(cleaned_response))
                 return cleaned_response
             logger.error(f"Failed to generate Gemini marketing message: {response}")
             return ""
@@ -71,12 +99,16 @@ class GeminiGenerationManager:
             return ""
 
 class GenerationManager:
-    def __init__(self, model_provider: str = "ollama", base_url: str = None, default_model: str = None, api_key: str = None):
+    def __init__(self, model_provider: str = "ollama", base_url: str = None, default_model: str = None, api_key: str = None,
+                 limiter=None, character_name: str = ""):
         self.model_provider = model_provider.lower()
+        self.character_name = character_name  # Usage is aggregated under this name
         self.base_url = base_url
         self.default_model = default_model
         self.api_key = api_key
         self.generator = self._initialize_generator()
+        self.limiter = limiter  # Optional AdaptiveConcurrencyLimiter shared per backend
+        self.semantic_cache = None  # Optional SemanticCache used by generate_cached
 
         logger.info(f"Initializing GenerationManager with provider: {self.model_provider}")
 
@@ -88,12 +120,73 @@ class GenerationManager:
         else:
             raise ValueError(f"Unsupported model provider: {self.model_provider}")
 
-    async def generate_text(self, context: str, model: str = None, personality: str = "") -> str:
-        return await self.generator.generate_text(context, model, personality)
+    async def generate_text(self, context: str, model: str = None, personality: str = "", call_type: str = "other") -> str:
+        return (await self.generate(context, model, personality, call_type)).text
+
+    async def generate(self, context: str, model: str = None, personality: str = "",
+                       call_type: str = "other") -> GenerationResult:
+        """Generate text and record its usage under call_type (relevance, reply, marketing, summary)"""
+        start = time.monotonic()
+        if self.limiter is None:
+            result = await self.generator.generate(context, model, personality)
+        else:
+            await self.limiter.acquire()
+            rtt_start = time.monotonic()
+            try:
+                result = await self.generator.generate(context, model, personality)
+            except asyncio.CancelledError:
+                # The caller gave up, which says nothing about the backend
+                self.limiter.release(None)
+                raise
+            except Exception:
+                self.limiter.release(time.monotonic() - rtt_start, success=False)
+                raise
+            self.limiter.release(time.monotonic() - rtt_start, result.ok,
+                                 key=f"{model or self.default_model}/{call_type}")
+        result.latency_seconds = time.monotonic() - start
+        usage.record(result, self.character_name, call_type)
+        return result
 
     async def generate_marketing_message(self, template: str, character_name: str) -> str:
         return await self.generator.generate_marketing_message(template, character_name)
 
+    async def generate_cached(self, context: str, cache_key: str, model: str = None, call_type: str = "reply") -> str:
+        """Generate text, serving a stored reply if a semantically similar cache_key was answered before"""
+        if self.semantic_cache is None:
+            return await self.generate_text(context, model, call_type=call_type)
+
+        cached, embedding = await self.semantic_cache.lookup(cache_key)
+        if cached is not None:
+            return cached
+
+        response = await self.generate_text(context, model, call_type=call_type)
+        if embedding is not None and response and not response.startswith("[INTERNAL]"):
+            self.semantic_cache.store(cache_key, response, embedding)
+        return response
+
+
+def create_generation_manager(character: Dict, settings: Settings) -> GenerationManager:
+    """Build the generation manager for a character; replies use replyModel when it is set"""
+    model_provider = character.get("modelProvider", "ollama")
+    base_url = character.get("baseUrl") or settings.ollama.base_url  # Only used by Ollama
+    default_model = character.get("model") or (settings.ollama.model if model_provider == "ollama" else None)
+    api_key = settings.gemini.api_key if model_provider == "gemini" else None
+
+    # One limiter per backend, shared by the handlers of all clients
+    limiter = None
+    if settings.concurrency.enabled:
+        backend = f"ollama:{base_url}" if model_provider == "ollama" else model_provider
+        limiter = get_limiter(backend, settings.concurrency)
+
+    return GenerationManager(
+        model_provider=model_provider,
+        base_url=base_url,
+        default_model=character.get("replyModel") or default_model,
+        api_key=api_key,
+        limiter=limiter,
+        character_name=character["name"],
+    )
+
 
 class OllamaGenerationManager:
     def __init__(self, base_url: str = None, default_model: str = None):
@@ -113,7 +206,7 @@ class OllamaGenerationManager:
         """Check if the Ollama server is accessible"""
         try:
             client = await self._get_client()
-            logger.debug(f"Checking server connection at {self.base_url}")
+            logger.debug("Checking server connection at {}", self.base_url)
             response = await client.get(f"{self.base_url}/api/version")
             if response.status_code == 200:
                 version = response.json().get('version')
@@ -137,7 +230,7 @@ class OllamaGenerationManager:
 
             if response.status_code == 200:
                 models = [m.get('name') for m in response.json().get('models', [])]
-                logger.debug(f"Found {len(models)} models: {models}")
+                logger.debug("Found {} models: {}", len(models), models)
                 return models
 
             logger.error(f"Failed to list models: {response.status_code} - {response.text}")
@@ -149,29 +242,58 @@ class OllamaGenerationManager:
             logger.error(f"Unexpected error listing models: {str(e)}")
             return []
 
-    async def generate_text(self, context: str, model: str = None) -> str:
+    async def embed(self, text: str, model: str = None) -> Optional[List[float]]:
+        """Embed text with the embeddings endpoint; returns None on failure"""
+        try:
+            client = await self._get_client()
+            response = await client.post(
+                f"{self.base_url}/api/embeddings",
+                json={"model": model or self.default_model, "prompt": text}
+            )
+            if response.status_code != 200:
+                logger.error(f"Embeddings API error: {response.status_code} - {response.text}")
+                return None
+            return response.json().get('embedding') or None
+        except httpx.ConnectError as e:
+            logger.error(f"Connection error during embedding: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error during embedding: {str(e)}")
+            return None
+
+    async def generate_text(self, context: str, model: str = None, personality: str = "") -> str:
         """Generate text using the specified model"""
+        return (await self.generate(context, model, personality)).text
+
+    async def generate(self, context: str, model: str = None, personality: str = "") -> GenerationResult:
+        """Generate text with the token counts and durations reported by /api/generate"""
+        model_to_use = model or self.default_model
+
+        def failed(text: str) -> GenerationResult:
+            return GenerationResult(text=text, provider="ollama", model=model_to_use)
+
         try:
+            if personality:
+                context = f"Personality: {personality}\n\n{context}"
+
             # First check server connection
             logger.debug("Starting text generation process")
             if not await self._check_server_connection():
-                return "[INTERNAL] Could not connect to Ollama server"
+                return failed("[INTERNAL] Could not connect to Ollama server")
 
             # List available models
             available_models = await self._list_models()
             if not available_models:
-                return "[INTERNAL] No models available on the server"
+                return failed("[INTERNAL] No models available on the server")
 
-            # Use default model if none specified
-            model_to_use = model or self.default_model
-            logger.debug(f"Using model: {model_to_use}")
+            logger.debug("Using model: {}", model_to_use)
 
             if model_to_use not in available_models:
                 logger.error(f"Model '{model_to_use}' not found. Available models: {available_models}")
-                return f"[INTERNAL] Model '{model_to_use}' not available. Please use one of: {', '.join(available_models)}"
+                return failed(f"[INTERNAL] Model '{model_to_use}' not available. Please use one of: {', '.join(available_models)}")
 
             client = await self._get_client()
-            logger.debug(f"Generating text with model: {model_to_use}")
+            logger.debug("Generating text with model: {}", model_to_use)
             response = await client.post(
                 f"{self.base_url}/api/generate",
                 json={
@@ -189,36 +311,50 @@ class OllamaGenerationManager:
 
             if response.status_code != 200:
                 logger.error(f"API error: {response.status_code} - {response.text}")
-                return "[INTERNAL] Error communicating with language model"
+                return failed("[INTERNAL] Error communicating with language model")
 
             result = response.json()
             if 'response' not in result:
                 logger.error(f"Unexpected response format: {json.dumps(result, indent=2)}")
-                return "[INTERNAL] Invalid response from language model"
+                return failed("[INTERNAL] Invalid response from language model")
 
             generated_text = result['response'].strip()
-            logger.debug(f"Successfully generated {len(generated_text)} characters")
-            return generated_text
+            logger.debug("Successfully generated {} characters", len(generated_text))
+            return GenerationResult(
+                text=generated_text,
+                provider="ollama",
+                model=model_to_use,
+                prompt_tokens=result.get('prompt_eval_count'),
+                completion_tokens=result.get('eval_count'),
+                load_seconds=_seconds(result.get('load_duration')),
+                prompt_eval_seconds=_seconds(result.get('prompt_eval_duration')),
+                eval_seconds=_seconds(result.get('eval_duration')),
+            )
 
         except httpx.ConnectError as e:
             logger.error(f"Connection error during generation: {e}")
-            return "[INTERNAL] Connection error with language model server"
+            return failed("[INTERNAL] Connection error with language model server")
         except Exception as e:
             logger.error(f"Unexpected error during generation: {str(e)}")
-            return "[INTERNAL] An unexpected error occurred"
+            return failed("[INTERNAL] An unexpected error occurred")
 
     async def generate_marketing_message(self, template: str, character_name: str) -> str:
         """Generate a marketing message using the template"""
         try:
-            logger.debug(f"Generating marketing message for character: {character_name}")
+            logger.debug("Generating marketing message for character: {}", character_name)
             response = await self.generate_text(template)
             if not response.startswith("[INTERNAL]"):
                 cleaned_response = response.strip().strip('"\'')
-                logger.debug(f"Generated marketing message of length {len(cleaned_response)}")
+                logger.debug("Generated marketing message of length {}", len(cleaned_response))
                 return cleaned_response
             logger.error(f"Failed to generate marketing message: {response}")
             return ""
 
         except Exception as e:
             logger.error(f"Error in marketing message generation: {str(e)}")
-            return ""
\ No newline at end of file
+            return ""
+
+
+def _seconds(nanoseconds: Optional[int]) -> Optional[float]:
+    """Convert an Ollama duration (nanoseconds) to seconds"""
+    return nanoseconds / NANOSECONDS if nanoseconds is not None else None
@@ -0,0 +1,259 @@
+import asyncio
+import itertools
+import json
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Set
+from loguru import logger
+from .generation import GenerationManager, create_generation_manager
+from .metrics import metrics
+from .process import run_child_process
+from .types import GenerationResult, MultiprocessSettings, Settings
+from .usage import UsageReporter
+
+# Frames are a 4-byte big-endian length followed by a UTF-8 JSON object
+HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+CONNECT_TIMEOUT_SECONDS = 30.0  # How long a worker waits for the service to (re)start
+CONNECT_RETRY_SECONDS = 0.5
+
+FRAME_ERRORS = (ConnectionError, asyncio.IncompleteReadError, json.JSONDecodeError)
+
+
+def encode_frame(payload: Dict) -> bytes:
+    data = json.dumps(payload, separators=(",", ":")).encode()
+    return HEADER.pack(len(data)) + data
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[Dict]:
+    """Read one frame; returns None when the peer closed the connection between frames"""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ConnectionError(f"Frame of {length} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    return json.loads(await reader.readexactly(length))
+
+
+async def write_frames(writer: asyncio.StreamWriter, outgoing: asyncio.Queue, max_batch: int) -> None:
+    """Send queued frames, coalescing up to max_batch of them into one write and flush"""
+    while True:
+        frames = [await outgoing.get()]
+        while len(frames) < max_batch and not outgoing.empty():
+            frames.append(outgoing.get_nowait())
+        writer.write(b"".join(encode_frame(frame) for frame in frames))
+        await writer.drain()
+
+
+class GenerationService:
+    """Serves generation requests from platform worker processes over a Unix socket.
+
+    Each connection may have max_pending requests in flight. Beyond that the
+    service stops reading from it, so the socket buffer fills and the worker's
+    writes block. Replies are queued per connection and flushed in batches.
+    The model backends, concurrency limiter and usage accounting all live here,
+    shared by every worker.
+    """
+
+    def __init__(self, generation_manager: GenerationManager, settings: MultiprocessSettings):
+        self.generation_manager = generation_manager
+        self.socket_path = settings.socket_path
+        self.max_batch = settings.max_batch
+        self.max_pending = settings.max_pending
+        self.in_flight = 0
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        directory = os.path.dirname(self.socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # Left behind by a service that crashed
+        self.server = await asyncio.start_unix_server(self._serve, path=self.socket_path)
+        logger.info(f"Generation service listening on {self.socket_path}")
+
+    def stop(self) -> None:
+        if self.server:
+            self.server.close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        outgoing: asyncio.Queue = asyncio.Queue()
+        slots = asyncio.Semaphore(self.max_pending)
+        sender = asyncio.create_task(write_frames(writer, outgoing, self.max_batch))
+        tasks: Set[asyncio.Task] = set()
+        logger.info("Platform worker connected to generation service")
+        try:
+            while True:
+                await slots.acquire()  # Backpressure: stop reading while this worker is at its limit
+                request = await read_frame(reader)
+                if request is None:
+                    break
+                task = asyncio.create_task(self._handle(request, outgoing, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except FRAME_ERRORS as e:
+            logger.error(f"Dropping platform worker connection: {e}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            sender.cancel()
+            writer.close()
+            logger.info("Platform worker disconnected from generation service")
+
+    async def _handle(self, request: Dict, outgoing: asyncio.Queue, slots: asyncio.Semaphore) -> None:
+        self.in_flight += 1
+        metrics.set_gauge("generation_service_in_flight", self.in_flight)
+        try:
+            if request.get("op") == "generate":
+                result = await self.generation_manager.generate(
+                    request["context"], request.get("model"), request.get("personality", ""), request.get("call_type", "other")
+                )
+                reply = {"id": request.get("id"), "result": result.model_dump()}
+            else:
+                reply = {"id": request.get("id"), "error": f"Unknown op: {request.get('op')}"}
+        except Exception as e:
+            logger.error(f"Error serving generation request: {e}")
+            reply = {"id": request.get("id"), "error": str(e)}
+        finally:
+            self.in_flight -= 1
+            metrics.set_gauge("generation_service_in_flight", self.in_flight)
+            slots.release()
+        outgoing.put_nowait(reply)
+
+
+class RemoteGenerationManager(GenerationManager):
+    """GenerationManager for platform workers that forwards calls to the generation service.
+
+    Requests are multiplexed over one connection by id. At most max_pending
+    are outstanding; further callers wait, which holds back the platform
+    client instead of queueing without bound. If the service goes away,
+    pending calls fail with an [INTERNAL] result and the next call reconnects.
+    """
+
+    def __init__(self, settings: MultiprocessSettings, character: Dict):
+        # No local generator or limiter; the service owns the model backends
+        self.model_provider = character.get("modelProvider", "ollama").lower()
+        self.default_model = character.get("replyModel") or character.get("model")
+        self.character_name = character["name"]
+        self.generator = None
+        self.limiter = None
+        self.semantic_cache = None
+        self.socket_path = settings.socket_path
+        self.max_batch = settings.max_batch
+        self.request_timeout = settings.request_timeout_seconds
+        self.slots = asyncio.Semaphore(settings.max_pending)
+        self.ids = itertools.count()
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.outgoing: Optional[asyncio.Queue] = None
+        self.connection_tasks: List[asyncio.Task] = []
+        self.connect_lock = asyncio.Lock()
+        self.connected = False
+        logger.info(f"Initializing RemoteGenerationManager for generation service at {self.socket_path}")
+
+    async def generate(self, context: str, model: str = None, personality: str = "",
+                       call_type: str = "other") -> GenerationResult:
+        start = time.monotonic()
+        request = {"op": "generate", "context": context, "model": model, "personality": personality, "call_type": call_type}
+        async with self.slots:
+            try:
+                reply = await self._request(request)
+                if "error" in reply:
+                    raise RuntimeError(reply["error"])
+                result = GenerationResult.model_validate(reply["result"])
+            except Exception as e:
+                logger.error(f"Generation service request failed: {e!r}")
+                result = GenerationResult(
+                    text=f"[INTERNAL] Generation service unavailable: {e!r}", provider=self.model_provider,
+                    model=model or self.default_model,
+                )
+        metrics.observe("generation_ipc_seconds", time.monotonic() - start, call_type=call_type)
+        return result
+
+    async def generate_marketing_message(self, template: str, character_name: str) -> str:
+        response = await self.generate_text(template, call_type="marketing")
+        if response.startswith("[INTERNAL]"):
+            logger.error(f"Failed to generate marketing message: {response}")
+            return ""
+        return response.strip().strip('"\'')
+
+    async def _request(self, payload: Dict) -> Dict:
+        await self._ensure_connected()
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.outgoing.put_nowait({"id": request_id, **payload})
+        try:
+            return await asyncio.wait_for(future, self.request_timeout)
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def _ensure_connected(self) -> None:
+        async with self.connect_lock:
+            if self.connected:
+                return
+            deadline = time.monotonic() + CONNECT_TIMEOUT_SECONDS
+            while True:
+                try:
+                    reader, writer = await asyncio.open_unix_connection(self.socket_path)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    if time.monotonic() >= deadline:
+                        raise ConnectionError(f"Generation service not reachable at {self.socket_path}")
+                    await asyncio.sleep(CONNECT_RETRY_SECONDS)
+            self.outgoing = asyncio.Queue()
+            self.connected = True
+            sender = asyncio.create_task(write_frames(writer, self.outgoing, self.max_batch))
+            receiver = asyncio.create_task(self._read_replies(reader, writer, sender))
+            self.connection_tasks = [sender, receiver]
+            logger.info(f"Connected to generation service at {self.socket_path}")
+
+    async def _read_replies(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, sender: asyncio.Task) -> None:
+        try:
+            while True:
+                reply = await read_frame(reader)
+                if reply is None:
+                    break
+                future = self.pending.get(reply.get("id"))
+                if future and not future.done():
+                    future.set_result(reply)
+        except FRAME_ERRORS as e:
+            logger.error(f"Error reading from generation service: {e}")
+        finally:
+            self.connected = False
+            sender.cancel()
+            writer.close()
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Generation service disconnected"))
+            logger.warning("Disconnected from generation service")
+
+    async def close(self) -> None:
+        for task in self.connection_tasks:
+            task.cancel()
+        await asyncio.gather(*self.connection_tasks, return_exceptions=True)
+
+
+def run_generation_service(character: Dict, settings: Settings) -> None:
+    """Process entry point for the generation service in multi-process mode"""
+    run_child_process(settings, lambda stop: _run_service(character, settings, stop))
+
+
+async def _run_service(character: Dict, settings: Settings, stop: asyncio.Event) -> None:
+    service = GenerationService(create_generation_manager(character, settings), settings.multiprocess)
+    reporter = UsageReporter(settings.usage)
+    await service.start()
+    reporter.start()
+    try:
+        await stop.wait()
+    finally:
+        reporter.stop()
+        service.stop()
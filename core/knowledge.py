@@ -0,0 +1,176 @@
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+from loguru import logger
+from .prompt_budget import estimate_tokens
+from .types import KnowledgeSettings
+
+KNOWLEDGE_EXTENSIONS = ('.md', '.txt')
+INDEX_VERSION = 1  # Bump when the index format or chunking changes
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i if in into is it its me my of on or our "
+    "so that the their them there these they this to was we what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def split_chunks(text: str, max_tokens: int) -> List[str]:
+    """Pack paragraphs into chunks of at most max_tokens, splitting long paragraphs by sentence"""
+    pieces: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+        else:
+            pieces.extend(s for s in SENTENCE_RE.split(paragraph) if s.strip())
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+class KnowledgeBase:
+    """BM25 index over the chunked files of a character's knowledge directory.
+
+    The index is cached on disk under a hash of the directory's contents and
+    the chunking settings, so unchanged knowledge is not re-chunked on start.
+    """
+
+    def __init__(self, directory: str, settings: KnowledgeSettings):
+        self.directory = directory
+        self.top_k = settings.top_k
+        self.chunk_tokens = settings.chunk_tokens
+        self.index_dir = settings.index_dir
+        self.chunks: List[Dict] = []  # {"source", "text"}
+        self.term_freqs: List[Dict[str, int]] = []
+        self.doc_freqs: Dict[str, int] = {}
+        self.lengths: List[int] = []
+        self.avg_length = 0.0
+        self._load()
+
+    def _read_files(self) -> List[Tuple[str, str]]:
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in sorted(names):
+                if name.endswith(KNOWLEDGE_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    with open(path, 'r') as f:
+                        files.append((os.path.relpath(path, self.directory), f.read()))
+        return sorted(files)
+
+    def _content_hash(self, files: List[Tuple[str, str]]) -> str:
+        digest = hashlib.sha256(f"v{INDEX_VERSION}:{self.chunk_tokens}".encode())
+        for path, content in files:
+            digest.update(path.encode() + b"\0" + content.encode() + b"\0")
+        return digest.hexdigest()[:20]
+
+    def _load(self) -> None:
+        if not os.path.isdir(self.directory):
+            logger.error(f"Knowledge directory not found: {self.directory}")
+            return
+
+        files = self._read_files()
+        index_path = os.path.join(self.index_dir, f"{self._content_hash(files)}.json") if self.index_dir else None
+        if index_path and os.path.exists(index_path):
+            try:
+                with open(index_path, 'r') as f:
+                    self._restore(json.load(f))
+                logger.info(f"Loaded knowledge index for {self.directory} from cache ({len(self.chunks)} chunks)")
+                return
+            except Exception as e:
+                logger.error(f"Error loading knowledge index {index_path}, rebuilding: {e}")
+
+        self._build(files)
+        logger.info(f"Indexed {len(files)} knowledge file(s) from {self.directory} into {len(self.chunks)} chunks")
+        if index_path:
+            try:
+                os.makedirs(self.index_dir, exist_ok=True)
+                tmp_path = index_path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(self._dump(), f)
+                os.replace(tmp_path, index_path)
+            except Exception as e:
+                logger.error(f"Error saving knowledge index {index_path}: {e}")
+
+    def _build(self, files: List[Tuple[str, str]]) -> None:
+        chunks = []
+        for source, content in files:
+            chunks.extend({"source": source, "text": chunk} for chunk in split_chunks(content, self.chunk_tokens))
+        term_freqs = [dict(Counter(tokenize(chunk["text"]))) for chunk in chunks]
+        self._restore({"chunks": chunks, "term_freqs": term_freqs})
+
+    def _dump(self) -> Dict:
+        return {"chunks": self.chunks, "term_freqs": self.term_freqs}
+
+    def _restore(self, data: Dict) -> None:
+        self.chunks = data["chunks"]
+        self.term_freqs = data["term_freqs"]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        doc_freqs: Dict[str, int] = {}
+        for tf in self.term_freqs:
+            for term in tf:
+                doc_freqs[term] = doc_freqs.get(term, 0) + 1
+        self.doc_freqs = doc_freqs
+
+    def search(self, query: str, top_k: int = None) -> List[Tuple[float, Dict]]:
+        """Return up to top_k (score, chunk) pairs ranked by BM25"""
+        terms = set(tokenize(query))
+        if not terms or not self.chunks:
+            return []
+
+        total = len(self.chunks)
+        idf = {
+            term: math.log(1 + (total - self.doc_freqs[term] + 0.5) / (self.doc_freqs[term] + 0.5))
+            for term in terms if term in self.doc_freqs
+        }
+        scored = []
+        for i, tf in enumerate(self.term_freqs):
+            score = 0.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[i] / self.avg_length) if self.avg_length else BM25_K1
+            for term, weight in idf.items():
+                freq = tf.get(term)
+                if freq:
+                    score += weight * freq * (BM25_K1 + 1) / (freq + norm)
+            if score > 0:
+                scored.append((score, i))
+
+        scored.sort(reverse=True)
+        return [(score, self.chunks[i]) for score, i in scored[:top_k or self.top_k]]
+
+    def context_for(self, query: str) -> str:
+        """Format the most relevant chunks for inclusion in a prompt"""
+        results = self.search(query)
+        if not results:
+            return ""
+        return "Relevant knowledge:\n" + "\n\n".join(chunk["text"] for _, chunk in results)
+
+    def full_text(self) -> str:
+        """All knowledge concatenated, as it would be if stuffed into the prompt"""
+        return "\n\n".join(chunk["text"] for chunk in self.chunks)
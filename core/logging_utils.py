@@ -0,0 +1,18 @@
+import sys
+from loguru import logger
+from .types import Settings
+
+
+def configure_logging(settings: Settings) -> None:
+    """Set the log level once at startup.
+
+    Debug calls below the sink level return before formatting, so debug logs
+    cost nothing on hot paths when ENABLE_DEBUG_LOGS is off.
+    """
+    logger.remove()
+    logger.add(sys.stderr, level="DEBUG" if settings.enable_debug_logs else "INFO")
+
+
+def preview(text: str, limit: int = 50) -> str:
+    """Shorten text for log output"""
+    return f"{text[:limit]}{'...' if len(text) > limit else ''}"
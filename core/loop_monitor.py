@@ -0,0 +1,79 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+from loguru import logger
+from .metrics import metrics
+
+
+class LoopLagMonitor:
+    """Measures event loop lag and reports the stack of code that blocks the loop.
+
+    A probe task on the loop records a heartbeat every interval and exports the
+    measured scheduling lag; lag over the threshold is logged as it happens and
+    the lag distribution is logged with the rest of the registry by MetricsReporter.
+    A helper thread watches the heartbeat; when it goes stale for longer than the
+    threshold, the loop is blocked and the thread logs the current stack of the
+    loop thread, which points at the culprit.
+    """
+
+    def __init__(self, interval_ms: float = 250, threshold_ms: float = 200):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self.probe_task: Optional[asyncio.Task] = None
+        self.watchdog_thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+        self.last_heartbeat = time.monotonic()
+        self.reported_heartbeat = 0.0  # Heartbeat for which a stack was already dumped
+
+    def start(self) -> None:
+        """Start monitoring the running loop; must be called from the loop thread"""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_heartbeat = time.monotonic()
+        self.stop_event.clear()
+        self.probe_task = self.loop.create_task(self._probe())
+        self.watchdog_thread = threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True)
+        self.watchdog_thread.start()
+        logger.info(f"Started event loop monitor (interval={self.interval * 1000:.0f}ms, threshold={self.threshold * 1000:.0f}ms)")
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.probe_task and not self.probe_task.done():
+            self.probe_task.cancel()
+
+    async def _probe(self) -> None:
+        """Sleep for a fixed interval and measure how late the loop wakes us up"""
+        while not self.stop_event.is_set():
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - start - self.interval)
+            self.last_heartbeat = now
+
+            metrics.set_gauge("event_loop_lag_current_seconds", lag)
+            metrics.observe("event_loop_lag_seconds", lag)
+            if lag > self.threshold:
+                metrics.inc("event_loop_stalls_total")
+                logger.warning(f"Event loop lag of {lag * 1000:.0f}ms (threshold {self.threshold * 1000:.0f}ms)")
+
+    def _watchdog(self) -> None:
+        """Runs in a helper thread and dumps the loop thread's stack while it is blocked"""
+        check_interval = min(self.interval, self.threshold) / 2
+        while not self.stop_event.wait(check_interval):
+            heartbeat = self.last_heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for < self.threshold or heartbeat == self.reported_heartbeat:
+                continue
+
+            self.reported_heartbeat = heartbeat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame))
+            metrics.inc("event_loop_blocking_dumps_total")
+            logger.warning(f"Event loop blocked for over {stalled_for * 1000:.0f}ms, current stack:\n{stack}")
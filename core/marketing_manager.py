@@ -1,67 +1,63 @@
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-import os
 from loguru import logger
 from .generation import GenerationManager
+from .knowledge import KnowledgeBase
+from .types import Settings
 
-# Get environment configurations
-ENABLE_MARKETING = os.getenv('ENABLE_MARKETING', 'true').lower() == 'true'
-ENABLE_DEBUG_LOGS = os.getenv('ENABLE_DEBUG_LOGS', 'false').lower() == 'true'
 
-# Marketing settings with environment variable overrides
-MARKETING_MESSAGE_THRESHOLD = int(os.getenv('MARKETING_MESSAGE_THRESHOLD', '5'))
-MARKETING_TIME_THRESHOLD_HOURS = float(os.getenv('MARKETING_TIME_THRESHOLD_HOURS', '6.0'))
-MARKETING_COOLDOWN_HOURS = float(os.getenv('MARKETING_COOLDOWN_HOURS', '6.0'))
-MARKETING_ACTIVITY_THRESHOLD = int(os.getenv('MARKETING_ACTIVITY_THRESHOLD', '10'))  # Messages to consider group as active
-MARKETING_COOLDOWN_REDUCTION = float(os.getenv('MARKETING_COOLDOWN_REDUCTION', '0.2'))  # Hours to reduce from cooldown per activity threshold
-MARKETING_MIN_COOLDOWN_HOURS = float(os.getenv('MARKETING_MIN_COOLDOWN_HOURS', '1.0'))  # Minimum cooldown period
-MARKETING_MAX_LENGTH = int(os.getenv('MARKETING_MAX_LENGTH', '500'))  # Maximum length of marketing messages
+def _hours(delta: timedelta) -> float:
+    return delta.total_seconds() / 3600
 
 class MarketingManager:
-    def __init__(self, prompt_content: str, character: Dict, generation_manager: GenerationManager):
+    def __init__(self, prompt_content: str, character: Dict, generation_manager: GenerationManager, settings: Settings,
+                 knowledge: Optional[KnowledgeBase] = None):
         self.prompt_content = prompt_content
+        self.knowledge = knowledge
+        self.settings = settings
+        self.enabled = settings.enable_marketing
+        self.config = settings.marketing
         self.character = character
         self.generation_manager = generation_manager
         self.message_count = 0
         self.activity_count = 0  # Track messages for activity-based cooldown reduction
         self.last_marketing_time: Optional[datetime] = None
-        self.base_cooldown = timedelta(hours=MARKETING_COOLDOWN_HOURS)
+        self.base_cooldown = timedelta(hours=self.config.cooldown_hours)
         self.marketing_cooldown = self.base_cooldown
-        self.message_threshold = MARKETING_MESSAGE_THRESHOLD
-        self.time_threshold = timedelta(hours=MARKETING_TIME_THRESHOLD_HOURS)
+        self.message_threshold = self.config.message_threshold
+        self.time_threshold = timedelta(hours=self.config.time_threshold_hours)
         self.start_time = datetime.now()
+        self.generating = False  # Concurrent messages must not each start a marketing message
 
         logger.info(f"Initialized MarketingManager for character '{character.get('name', 'unknown')}'")
-        logger.info(f"Settings: message_threshold={self.message_threshold}, time_threshold={self.time_threshold.total_seconds()/3600}h, cooldown={self.marketing_cooldown.total_seconds()/3600}h")
+        logger.info(f"Settings: message_threshold={self.message_threshold}, time_threshold={_hours(self.time_threshold)}h, cooldown={_hours(self.marketing_cooldown)}h")
 
     def record_message(self) -> None:
         """Record a new message in the group and adjust cooldown based on activity"""
-        if not ENABLE_MARKETING:
+        if not self.enabled:
             return
 
         self.message_count += 1
         self.activity_count += 1
 
         # Reduce cooldown if group is active
-        if self.activity_count >= MARKETING_ACTIVITY_THRESHOLD:
-            reduction = timedelta(hours=MARKETING_COOLDOWN_REDUCTION)
-            min_cooldown = timedelta(hours=MARKETING_MIN_COOLDOWN_HOURS)
+        if self.activity_count >= self.config.activity_threshold:
+            reduction = timedelta(hours=self.config.cooldown_reduction)
+            min_cooldown = timedelta(hours=self.config.min_cooldown_hours)
             self.marketing_cooldown = max(min_cooldown, self.base_cooldown - reduction)
             self.activity_count = 0  # Reset activity counter
 
-            if ENABLE_DEBUG_LOGS:
-                logger.debug(f"Reduced marketing cooldown to {self.marketing_cooldown.total_seconds()/3600:.1f}h (min={min_cooldown.total_seconds()/3600:.1f}h)")
+            logger.opt(lazy=True).debug("Reduced marketing cooldown to {:.1f}h (min={:.1f}h)",
+                                        lambda: _hours(self.marketing_cooldown), lambda: _hours(min_cooldown))
 
-        if ENABLE_DEBUG_LOGS:
-            time_since_start = datetime.now() - self.start_time
-            time_since_last = datetime.now() - (self.last_marketing_time or self.start_time)
-            logger.debug(f"Message recorded: count={self.message_count}, activity={self.activity_count}/{MARKETING_ACTIVITY_THRESHOLD}, "
-                        f"time_since_start={time_since_start.total_seconds()/3600:.1f}h, "
-                        f"time_since_last_marketing={time_since_last.total_seconds()/3600:.1f}h")
+        logger.opt(lazy=True).debug("Message recorded: count={}, activity={}/{}, time_since_start={:.1f}h, time_since_last_marketing={:.1f}h",
+                                    lambda: self.message_count, lambda: self.activity_count, lambda: self.config.activity_threshold,
+                                    lambda: _hours(datetime.now() - self.start_time),
+                                    lambda: _hours(datetime.now() - (self.last_marketing_time or self.start_time)))
 
     async def should_send_marketing(self) -> bool:
         """Check if we should send a marketing message based on conditions"""
-        if not ENABLE_MARKETING:
+        if not self.enabled:
             return False
 
         current_time = datetime.now()
@@ -70,51 +66,57 @@ class MarketingManager:
         if self.last_marketing_time:
             time_since_last = current_time - self.last_marketing_time
             if time_since_last < self.marketing_cooldown:
-                if ENABLE_DEBUG_LOGS:
-                    logger.debug(f"Marketing on cooldown: {(self.marketing_cooldown - time_since_last).total_seconds()/3600:.1f}h remaining")
+                logger.opt(lazy=True).debug("Marketing on cooldown: {:.1f}h remaining",
+                                            lambda: _hours(self.marketing_cooldown - time_since_last))
                 return False
 
         # Check message count condition
         if self.message_count >= self.message_threshold:
-            if ENABLE_DEBUG_LOGS:
-                logger.info(f"Marketing trigger: message threshold reached ({self.message_count}/{self.message_threshold} messages)")
+            logger.debug("Marketing trigger: message threshold reached ({}/{} messages)", self.message_count, self.message_threshold)
             return True
 
         # Check time elapsed condition
         time_elapsed = current_time - self.start_time
         if time_elapsed >= self.time_threshold:
-            if ENABLE_DEBUG_LOGS:
-                logger.info(f"Marketing trigger: time threshold reached ({time_elapsed.total_seconds()/3600:.1f}/{self.time_threshold.total_seconds()/3600:.1f} hours)")
+            logger.opt(lazy=True).debug("Marketing trigger: time threshold reached ({:.1f}/{:.1f} hours)",
+                                        lambda: _hours(time_elapsed), lambda: _hours(self.time_threshold))
             return True
 
         # Log current status if not triggering
-        if ENABLE_DEBUG_LOGS:
-            logger.debug(f"Marketing status: messages={self.message_count}/{self.message_threshold}, time={time_elapsed.total_seconds()/3600:.1f}/{self.time_threshold.total_seconds()/3600:.1f}h")
+        logger.opt(lazy=True).debug("Marketing status: messages={}/{}, time={:.1f}/{:.1f}h",
+                                    lambda: self.message_count, lambda: self.message_threshold,
+                                    lambda: _hours(time_elapsed), lambda: _hours(self.time_threshold))
         return False
 
     async def generate_marketing_message(self) -> Optional[str]:
         """Generate and return a marketing message"""
-        if not ENABLE_MARKETING:
+        if not self.enabled:
             return None
 
         try:
             character_name = self.character.get("name", "unknown")
-            if ENABLE_DEBUG_LOGS:
-                logger.debug(f"Checking marketing conditions for {character_name}")
+            logger.debug("Checking marketing conditions for {}", character_name)
 
-            if not await self.should_send_marketing():
+            if self.generating or not await self.should_send_marketing():
                 return None
 
-            if ENABLE_DEBUG_LOGS:
-                logger.info(f"Generating marketing message for {character_name}")
+            logger.debug("Generating marketing message for {}", character_name)
 
             # Generate message using LLM
+            instruction = "Generate a concise marketing message related to NeuronLink."
+            knowledge = self.knowledge.context_for(instruction) if self.knowledge else ""
             prompt = f"""
 {self.prompt_content}
 
-Generate a concise marketing message related to NeuronLink.
+{knowledge}
+
+{instruction}
 """
-            message = await self.generation_manager.generate_text(prompt)
+            self.generating = True
+            try:
+                message = await self.generation_manager.generate_text(prompt, call_type="marketing")
+            finally:
+                self.generating = False
 
 
             if message and not message.startswith("[INTERNAL]"):
@@ -126,12 +128,12 @@ Generate a concise marketing message related to NeuronLink.
                 self.message_count = 0  # Reset message count
                 self.start_time = current_time  # Reset timer
 
-                if ENABLE_DEBUG_LOGS:
-                    logger.info(f"Marketing message generated ({len(message)} chars)")
-                    logger.info(f"Stats reset - Messages: {prev_count}→0, Timer: {(current_time - prev_time).total_seconds()/3600:.1f}h→0h")
+                logger.debug("Marketing message generated ({} chars)", len(message))
+                logger.opt(lazy=True).debug("Stats reset - Messages: {}→0, Timer: {:.1f}h→0h",
+                                            lambda: prev_count, lambda: _hours(current_time - prev_time))
                 return message
 
-            if ENABLE_DEBUG_LOGS:
+            if self.settings.enable_debug_logs:
                 logger.error(f"Failed to generate marketing message: {message}")
             return None
 
@@ -1,30 +1,65 @@
-from typing import Dict, Optional
-import os
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from loguru import logger
-from .generation import GenerationManager
+from .generation import GenerationManager, OllamaGenerationManager, create_generation_manager
 from .marketing_manager import MarketingManager
+from .prompt_budget import PromptBudget
+from .conversation_memory import ConversationMemory, USER_ROLE, ASSISTANT_ROLE
+from .dedup import NearDuplicateIndex
+from .knowledge import KnowledgeBase
+from .logging_utils import preview
+from .metrics import metrics
+from .semantic_cache import get_semantic_cache, numpy_available
+from .types import Settings
 
-# Get environment configurations
-ENABLE_DEBUG_LOGS = os.getenv('ENABLE_DEBUG_LOGS', 'false').lower() == 'true'
-ENABLE_REPLIES = os.getenv('ENABLE_REPLIES', 'true').lower() == 'true'
+SEMANTIC_CACHE_MIN_WORDS = 4  # Shorter messages always get a fresh reply
+
+CONFIDENCE_RE = re.compile(r"\b(0(?:\.\d+)?|1(?:\.0+)?)\b")
+
+
+def parse_relevance(response: str) -> Tuple[bool, Optional[float]]:
+    """Parse a 'yes 0.9' style answer into (relevant, confidence); ambiguous answers get confidence 0"""
+    normalized = response.strip().lower()
+    words = set(re.findall(r"[a-z]+", normalized))
+    relevant = "yes" in words
+    if ("yes" in words) == ("no" in words):
+        return relevant, 0.0
+    match = CONFIDENCE_RE.search(normalized)
+    return relevant, float(match.group(1)) if match else None
 
 class MessageHandler:
-    def __init__(self, prompt_file: str, character: Dict):
+    def __init__(self, prompt_file: str, character: Dict, settings: Settings,
+                 generation_manager: Optional[GenerationManager] = None):
         self.prompt_file = prompt_file
+        self.settings = settings
         self.prompt_content = self.load_prompt()
         self.character = character
         model_provider = character.get("modelProvider", "ollama")
-        base_url = character.get("baseUrl")  # Optional, only for Ollama
-        default_model = character.get("model")
-        api_key = os.getenv("GEMINI_API_KEY") if model_provider == "gemini" else None
-
-        self.generation_manager = GenerationManager(
-            model_provider=model_provider,
-            base_url=base_url,
-            default_model=default_model,
-            api_key=api_key,
-        )
-        self.marketing_manager = MarketingManager(self.prompt_content, character, self.generation_manager)
+        default_model = character.get("model") or (settings.ollama.model if model_provider == "ollama" else None)
+        # Relevance checks go to the small triage model; replies and uncertain checks to the reply model
+        self.triage_model = character.get("triageModel") or default_model
+        self.reply_model = character.get("replyModel") or default_model
+        self.triage_count = 0
+        self.escalation_count = 0
+
+        # Injected in multi-process mode, where generation runs in a separate service process
+        self.generation_manager = generation_manager or create_generation_manager(character, settings)
+        self.prompt_budget = PromptBudget(model_provider, settings.prompt_budget, character.get("inputTokenLimits"))
+        # With a knowledge directory the prompt file is a short persona and facts are retrieved per message
+        self.knowledge: Optional[KnowledgeBase] = None
+        if character.get("knowledge_dir"):
+            self.knowledge = KnowledgeBase(character["knowledge_dir"], settings.knowledge)
+        self.marketing_manager = MarketingManager(self.prompt_content, character, self.generation_manager, settings, self.knowledge)
+        self.memory = ConversationMemory(self.generation_manager, settings.memory) if settings.memory.enabled else None
+        # Called after the prompt changes, so caches derived from the old prompt can be dropped
+        self.prompt_listeners: List[Callable[[], None]] = []
+        self.dedup: Optional[NearDuplicateIndex] = None
+        if settings.dedup.enabled:
+            self.dedup = NearDuplicateIndex(settings.dedup, name=character.get("name", "default"))
+            self.prompt_listeners.append(self.dedup.clear)
+        if character.get("semanticCache"):
+            self._init_semantic_cache()
         logger.info(f"Initialized MessageHandler using prompt file: {self.prompt_file}")
 
     def load_prompt(self) -> str:
@@ -36,74 +71,131 @@ class MessageHandler:
             logger.error(f"Error loading prompt file: {e}")
             return ""
 
+    def _init_semantic_cache(self) -> None:
+        """Attach a semantic reply cache to the generation layer; embeddings always come from Ollama"""
+        if not numpy_available():
+            logger.warning("semanticCache is enabled but numpy is not installed; continuing without it")
+            return
+        embedder = OllamaGenerationManager(base_url=self.settings.ollama.base_url)
+        cache = get_semantic_cache(self.settings.semantic_cache, embedder, self.character["name"], self.prompt_content)
+        self.generation_manager.semantic_cache = cache
+        self.prompt_listeners.append(lambda: cache.invalidate(self.prompt_content))
+
+    def _knowledge_block(self, message: str) -> str:
+        """Retrieved knowledge chunks for the message, formatted as a prompt section"""
+        if self.knowledge is None:
+            return ""
+        context = self.knowledge.context_for(message)
+        return f"\n{context}\n" if context else ""
+
+    def update_prompt(self, prompt_content: str) -> None:
+        """Swap in new prompt content and invalidate prompt-dependent caches."""
+        if prompt_content == self.prompt_content:
+            return
+        # Plain attribute swaps on the loop thread; calls already in flight keep the prompt they built
+        self.prompt_content = prompt_content
+        self.marketing_manager.prompt_content = prompt_content
+        for listener in self.prompt_listeners:
+            listener()
+        logger.info(f"Updated prompt for {self.character.get('name', 'unknown')} from {self.prompt_file}")
+
     async def _is_relevant(self, message: str) -> bool:
         """Determine if the message is relevant based on the prompt."""
         try:
+            prompt_message = self.prompt_budget.fit(message, "relevance")
             prompt = f"""
 {self.prompt_content}
+{self._knowledge_block(message)}
+Message: '{prompt_message}'
 
-Message: '{message}'
-
-Based on the provided context, is this message relevant and should receive a reply? Answer with 'yes' or 'no'.
+Based on the provided context, is this message relevant and should receive a reply? Answer with 'yes' or 'no', followed by your confidence from 0 to 1 (for example: 'yes 0.9').
 """
-            response = await self.generation_manager.generate_text(prompt, personality="")
-            if response.startswith("[INTERNAL]"):
-                logger.error(f"Error checking relevance: {response}")
+            verdict = await self._ask_relevance(prompt, prompt_message, self.triage_model, "triage")
+            if verdict is None:
                 return False
+            relevant, confidence = verdict
+
+            self.triage_count += 1
+            threshold = self.settings.cascade.confidence_threshold
+            if self.triage_model != self.reply_model and (confidence is None or confidence < threshold):
+                self.escalation_count += 1
+                metrics.inc("triage_escalations_total", model=self.triage_model)
+                logger.debug("Triage confidence {} below {}, escalating to {}", confidence, threshold, self.reply_model)
+                escalated = await self._ask_relevance(prompt, prompt_message, self.reply_model, "escalation")
+                if escalated is not None:
+                    relevant = escalated[0]
+            metrics.inc("triage_total", model=self.triage_model)
+            metrics.set_gauge("triage_escalation_rate", self.escalation_count / self.triage_count, model=self.triage_model)
 
-            normalized_response = response.strip().lower()
-            logger.info(f"The message '{message}' relevance is {normalized_response}")
-            return "yes" in normalized_response
+            if self.dedup is not None:
+                self.dedup.add(message, relevant)
+            return relevant
 
         except Exception as e:
             logger.error(f"Error in _is_relevant: {e}")
             return False
 
+    async def _ask_relevance(self, prompt: str, prompt_message: str, model: Optional[str], stage: str) -> Optional[Tuple[bool, Optional[float]]]:
+        """Ask one model whether the message is relevant; None if the call failed"""
+        start = time.perf_counter()
+        response = await self.generation_manager.generate_text(prompt, model=model, personality="", call_type="relevance")
+        metrics.observe("llm_stage_latency_seconds", time.perf_counter() - start, stage=stage, model=model)
+        if response.startswith("[INTERNAL]"):
+            logger.error(f"Error checking relevance: {response}")
+            return None
+
+        normalized_response = response.strip().lower()
+        logger.info("The message '{}' relevance is {} ({} via {})", prompt_message, normalized_response, stage, model)
+        return parse_relevance(normalized_response)
+
     async def _should_reply(self, message: str) -> bool:
         """Determine if we should reply to this message."""
-        if not ENABLE_REPLIES:
+        if not self.settings.enable_replies:
             return False
 
         try:
             if not await self._is_relevant(message):
-                if ENABLE_DEBUG_LOGS:
-                    logger.debug(f"Message is not relevant, skipping")
+                logger.debug("Message is not relevant, skipping")
                 return False
 
-            if ENABLE_DEBUG_LOGS:
-                logger.debug("Message is relevant")
+            logger.debug("Message is relevant")
             return True
 
         except Exception as e:
             logger.error(f"Error in _should_reply: {e}")
             return False
 
-    async def _generate_reply(self, message: str) -> Optional[str]:
+    async def _generate_reply(self, message: str, history: str = "") -> Optional[str]:
         """Generate a reply using the LLM based on the prompt."""
-        if not ENABLE_REPLIES:
+        if not self.settings.enable_replies:
             return None
 
         try:
-            if ENABLE_DEBUG_LOGS:
-                logger.debug(f"Generating reply for message: '{message[:50]}{'...' if len(message) > 50 else ''}' ({len(message)} chars)")
+            logger.opt(lazy=True).debug("Generating reply for message: '{}' ({} chars)",
+                                        lambda: preview(message), lambda: len(message))
 
+            history_block = f"Recent conversation:\n{history}\n\n" if history else ""
             prompt = f"""
 {self.prompt_content}
-
-Message: '{message}'
+{self._knowledge_block(message)}
+{history_block}Message: '{message}'
 
 Reply:"""
 
-            if ENABLE_DEBUG_LOGS:
-                logger.debug(f"Generated context of {len(prompt)} chars for LLM")
+            logger.debug("Generated context of {} chars for LLM", len(prompt))
 
-            response = await self.generation_manager.generate_text(prompt, personality="")
+            start = time.perf_counter()
+            if len(message.split()) >= SEMANTIC_CACHE_MIN_WORDS:
+                response = await self.generation_manager.generate_cached(prompt, cache_key=message, model=self.reply_model)
+            else:
+                # Short follow-ups depend on conversation context that cached replies don't see
+                response = await self.generation_manager.generate_text(prompt, model=self.reply_model, personality="", call_type="reply")
+            metrics.observe("llm_stage_latency_seconds", time.perf_counter() - start, stage="reply", model=self.reply_model)
             if response and not response.startswith("[INTERNAL]"):
-                if ENABLE_DEBUG_LOGS:
-                    logger.info(f"Generated reply of {len(response)} chars")
+                logger.debug("Generated reply of {} chars", len(response))
                 return response
 
-            if ENABLE_DEBUG_LOGS:
+            if self.settings.enable_debug_logs:
                 logger.error(f"Failed to generate response: {response}")
             return None
 
@@ -111,12 +203,26 @@ Reply:"""
             logger.error(f"Error generating reply: {e}")
             return None
 
-    async def handle_message(self, message: str) -> Optional[str]:
+    async def handle_message(self, message: str, chat_id: Optional[Any] = None) -> Optional[str]:
         """Main message handling logic."""
+        response, _ = await self.respond(message, chat_id)
+        return response
+
+    async def respond(self, message: str, chat_id: Optional[Any] = None) -> Tuple[Optional[str], bool]:
+        """Like handle_message, also telling whether the text is a marketing message rather than a reply"""
         try:
             character_name = self.character.get("name", "unknown")
-            if ENABLE_DEBUG_LOGS:
-                logger.info(f"[{character_name}] Processing message: '{message[:50]}{'...' if len(message) > 50 else ''}' ({len(message)} chars)")
+            logger.opt(lazy=True).debug("[{}] Processing message: '{}' ({} chars)",
+                                        lambda: character_name, lambda: preview(message), lambda: len(message))
+
+            # Cap user input once so a huge paste cannot blow up prefill for this or later prompts
+            message = self.prompt_budget.fit(message, "reply")
+
+            # Snapshot the history before recording this message so it is not duplicated in the prompt
+            history = ""
+            if self.memory is not None and chat_id is not None:
+                history = self.memory.build_context(chat_id)
+                self.memory.record(chat_id, USER_ROLE, message)
 
             # Record message for marketing manager
             self.marketing_manager.record_message()
@@ -124,22 +230,39 @@ Reply:"""
             # First check if we should send a marketing message
             marketing_message = await self.marketing_manager.generate_marketing_message()
             if marketing_message:
-                if ENABLE_DEBUG_LOGS:
-                    logger.info(f"[{character_name}] Sending marketing message ({len(marketing_message)} chars)")
-                return marketing_message
+                logger.debug("[{}] Sending marketing message ({} chars)", character_name, len(marketing_message))
+                self._remember_reply(chat_id, marketing_message)
+                return marketing_message, True
+
+            # A near-duplicate of an already judged message reuses its verdict instead of asking the LLM
+            duplicate = self.dedup.match(message) if self.dedup is not None else None
+            if duplicate is not None:
+                should_reply = self.settings.enable_replies and duplicate.relevant
+            else:
+                should_reply = await self._should_reply(message)
 
             # If not sending marketing, check if we should reply to this message
-            if not await self._should_reply(message):
-                if ENABLE_DEBUG_LOGS:
-                    logger.debug(f"[{character_name}] Message doesn't meet reply criteria")
-                return None
+            if not should_reply:
+                logger.debug("[{}] Message doesn't meet reply criteria", character_name)
+                return None, False
 
             # Generate and return reply
-            reply = await self._generate_reply(message)
-            if reply and ENABLE_DEBUG_LOGS:
-                logger.info(f"[{character_name}] Sending reply ({len(reply)} chars)")
-            return reply
+            if duplicate is not None and duplicate.reply and self.settings.dedup.reuse_reply:
+                reply = duplicate.reply
+            else:
+                reply = await self._generate_reply(message, history)
+                if reply and self.dedup is not None:
+                    self.dedup.set_reply(message, reply)
+            if reply:
+                logger.debug("[{}] Sending reply ({} chars)", character_name, len(reply))
+            self._remember_reply(chat_id, reply)
+            return reply, False
 
         except Exception as e:
             logger.error(f"Error in handle_message: {e}")
-            return None
+            return None, False
+
+    def _remember_reply(self, chat_id: Optional[Any], reply: Optional[str]) -> None:
+        """Record our own outgoing message in the chat history."""
+        if self.memory is not None and chat_id is not None and reply:
+            self.memory.record(chat_id, ASSISTANT_ROLE, reply)
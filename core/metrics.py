@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from loguru import logger
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, object]) -> MetricKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_key(key: MetricKey) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+
+class Observation:
+    """Running count/sum/max plus a bounded sample window for percentiles"""
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.samples.append(value)
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and observations keyed by name and labels"""
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self.counters: Dict[MetricKey, float] = {}
+        self.gauges: Dict[MetricKey, float] = {}
+        self.observations: Dict[MetricKey, Observation] = {}
+        self.started_at = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = _key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        self.gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _key(name, labels)
+        observation = self.observations.get(key)
+        if observation is None:
+            observation = self.observations[key] = Observation(self.window)
+        observation.add(value)
+
+    def get_counter(self, name: str, **labels) -> float:
+        return self.counters.get(_key(name, labels), 0)
+
+    def get_gauge(self, name: str, **labels) -> float:
+        return self.gauges.get(_key(name, labels), 0.0)
+
+    def snapshot(self) -> Dict[str, object]:
+        """Return all metrics as a flat dict of formatted names"""
+        data: Dict[str, object] = {}
+        for key, value in self.counters.items():
+            data[_format_key(key)] = value
+        for key, value in self.gauges.items():
+            data[_format_key(key)] = value
+        for key, observation in self.observations.items():
+            data[_format_key(key)] = observation.summary()
+        return data
+
+    def log_summary(self) -> None:
+        for name, value in sorted(self.snapshot().items()):
+            logger.info(f"metric {name} = {value}")
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
+
+
+class MetricsReporter:
+    """Logs the registry on an interval and once more on stop"""
+
+    def __init__(self, interval_minutes: float, registry: Optional[MetricsRegistry] = None):
+        self.interval = interval_minutes * 60
+        self.registry = registry or metrics
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.interval > 0 and self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self.task and not self.task.done():
+            self.task.cancel()
+        self.log()
+
+    def log(self) -> None:
+        self.registry.log_summary()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.log()
+            except Exception as e:
+                logger.error(f"Error logging metrics: {e}")
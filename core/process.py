@@ -0,0 +1,44 @@
+import asyncio
+import signal
+import sys
+from typing import Awaitable, Callable
+from loguru import logger
+from .logging_utils import configure_logging
+from .loop_monitor import LoopLagMonitor
+from .metrics import MetricsReporter
+from .types import Settings
+
+
+def run_child_process(settings: Settings, main: Callable[[asyncio.Event], Awaitable[None]]) -> None:
+    """Entry point shared by the processes started in multi-process mode.
+
+    main receives an event that is set when the supervisor asks the process
+    to stop. Ctrl+C reaches the whole process group, so children ignore
+    SIGINT and leave the shutdown order to the supervisor, which sends SIGTERM.
+    An exception from main exits with a non-zero code so the process is restarted.
+    """
+    configure_logging(settings)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        asyncio.run(_run(settings, main))
+    except Exception as e:
+        logger.exception(f"Process failed: {e}")
+        sys.exit(1)
+
+
+async def _run(settings: Settings, main: Callable[[asyncio.Event], Awaitable[None]]) -> None:
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    monitor = None
+    if settings.loop_monitor.enabled:
+        monitor = LoopLagMonitor(settings.loop_monitor.interval_ms, settings.loop_monitor.threshold_ms)
+        monitor.start()
+    # Each process has its own registry, so each logs it
+    reporter = MetricsReporter(settings.metrics.log_interval_minutes)
+    reporter.start()
+    try:
+        await main(stop)
+    finally:
+        reporter.stop()
+        if monitor:
+            monitor.stop()
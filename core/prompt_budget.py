@@ -0,0 +1,119 @@
+import re
+from typing import Dict, Optional
+from loguru import logger
+from .metrics import metrics
+from .types import PromptBudgetSettings
+
+# Approximate characters per token for ASCII text; non-ASCII characters count about one token each
+CHARS_PER_TOKEN = {
+    "gemini": 4.0,
+    "ollama": 3.6,
+    "default": 4.0,
+}
+
+CODE_BLOCK_RE = re.compile(r"```[^\n]*\n(.*?)```", re.DOTALL)
+TRUNCATION_MARKER = " [...] "
+
+
+def estimate_tokens(text: str, provider: str = "default") -> int:
+    """Fast local token estimate for a provider, without running a tokenizer"""
+    if not text:
+        return 0
+    ratio = CHARS_PER_TOKEN.get(provider, CHARS_PER_TOKEN["default"])
+    if text.isascii():
+        return int(len(text) / ratio) + 1
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return int((len(text) - non_ascii) / ratio + non_ascii) + 1
+
+
+def collapse_code_blocks(text: str, max_lines: int = 12) -> str:
+    """Replace the middle of long fenced code blocks with a short marker"""
+    def _collapse(match: re.Match) -> str:
+        lines = match.group(1).splitlines()
+        if len(lines) <= max_lines:
+            return match.group(0)
+        head = max_lines * 2 // 3
+        tail = max_lines - head
+        fence = match.group(0)[:match.group(0).index("\n") + 1]
+        kept = lines[:head] + [f"[... {len(lines) - max_lines} lines omitted ...]"] + lines[-tail:]
+        return fence + "\n".join(kept) + "\n```"
+
+    return CODE_BLOCK_RE.sub(_collapse, text)
+
+
+def truncate_head_tail(text: str, max_chars: int) -> str:
+    """Keep the start and end of the text, cutting at whitespace where possible"""
+    if len(text) <= max_chars:
+        return text
+    available = max(0, max_chars - len(TRUNCATION_MARKER))
+    head_len = available * 2 // 3
+    tail_len = available - head_len
+
+    head = text[:head_len]
+    cut = head.rfind(" ")
+    if cut > head_len // 2:
+        head = head[:cut]
+
+    tail = text[len(text) - tail_len:] if tail_len else ""
+    cut = tail.find(" ")
+    if 0 <= cut < tail_len // 2:
+        tail = tail[cut + 1:]
+
+    return head + TRUNCATION_MARKER + tail
+
+
+class PromptBudget:
+    """Caps user-supplied text per prompt profile so prompt size is bounded by configuration"""
+
+    def __init__(self, provider: str, settings: PromptBudgetSettings, limits: Optional[Dict[str, int]] = None):
+        self.provider = provider
+        self.code_block_max_lines = settings.code_block_max_lines
+        self.limits = {
+            "relevance": settings.max_relevance_tokens,
+            "reply": settings.max_reply_tokens,
+        }
+        if limits:
+            self.limits.update(limits)
+        logger.info(f"Initialized PromptBudget for provider '{provider}' with limits: {self.limits}")
+
+    def estimate(self, text: str) -> int:
+        return estimate_tokens(text, self.provider)
+
+    def fit(self, text: str, profile: str) -> str:
+        """Return text that fits in the token cap of the given profile"""
+        max_tokens = self.limits.get(profile)
+        metrics.inc("prompt_budget_checks_total", profile=profile)
+        if not max_tokens or not text:
+            return text
+
+        tokens = self.estimate(text)
+        if tokens <= max_tokens:
+            self._publish_rate(profile)
+            return text
+
+        fitted = collapse_code_blocks(text, self.code_block_max_lines)
+        fitted_tokens = self.estimate(fitted)
+        if fitted_tokens > max_tokens:
+            # Scale the character budget by the observed chars/token of this text
+            max_chars = int(len(fitted) * max_tokens / fitted_tokens)
+            fitted = truncate_head_tail(fitted, max_chars)
+            fitted_tokens = self.estimate(fitted)
+
+        metrics.inc("prompt_truncations_total", profile=profile)
+        metrics.inc("prompt_tokens_truncated_total", tokens - fitted_tokens, profile=profile)
+        self._publish_rate(profile)
+        logger.debug("Truncated {} input from ~{} to ~{} tokens", profile, tokens, fitted_tokens)
+        return fitted
+
+    @property
+    def truncation_rate(self) -> Dict[str, float]:
+        """Fraction of checked inputs that needed truncation, per profile"""
+        rates = {}
+        for profile in self.limits:
+            checks = metrics.get_counter("prompt_budget_checks_total", profile=profile)
+            truncations = metrics.get_counter("prompt_truncations_total", profile=profile)
+            rates[profile] = truncations / checks if checks else 0.0
+        return rates
+
+    def _publish_rate(self, profile: str) -> None:
+        metrics.set_gauge("prompt_truncation_rate", self.truncation_rate[profile], profile=profile)
@@ -0,0 +1,268 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from .metrics import metrics
+from .types import SemanticCacheSettings
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; the cache is disabled without it
+    np = None
+
+SAVE_DELAY_SECONDS = 5.0  # Stores within this window are written to disk together
+
+
+def prompt_hash(prompt_content: str) -> str:
+    return hashlib.sha256(prompt_content.encode()).hexdigest()[:16]
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+class SemanticCache:
+    """Reply cache keyed by question embeddings.
+
+    Question vectors are L2-normalized rows of a (capacity x dim) float32
+    matrix, memory-mapped from disk when a cache directory is configured, so
+    cosine similarity is a single matrix product. A stored reply is served
+    when the best match reaches the similarity threshold. Entries are evicted
+    by age first, then least recently used. The cache is tied to a hash of the
+    character's prompt and is emptied when the prompt changes.
+    """
+
+    def __init__(self, settings: SemanticCacheSettings, embedder, name: str, prompt_content: str):
+        if np is None:
+            raise RuntimeError("numpy is required for the semantic cache (pip install numpy)")
+        self.embedder = embedder
+        self.name = name
+        self.embedding_model = settings.embedding_model
+        self.threshold = settings.threshold
+        self.capacity = settings.capacity
+        self.ttl = settings.ttl_hours * 3600
+        self.top_k = settings.top_k
+        self.directory = os.path.join(settings.cache_dir, name) if settings.cache_dir else None
+        self.prompt_hash = prompt_hash(prompt_content)
+
+        self.dim: Optional[int] = None
+        self.vectors = None  # (capacity, dim) float32, allocated on the first embedding
+        self.valid = np.zeros(self.capacity, dtype=bool)
+        self.created = np.zeros(self.capacity, dtype=np.float64)
+        self.last_used = np.zeros(self.capacity, dtype=np.float64)
+        self.replies: List[Optional[str]] = [None] * self.capacity
+        self.questions: List[Optional[str]] = [None] * self.capacity
+        self.save_task: Optional[asyncio.Task] = None
+
+        self._load()
+        logger.info(f"Initialized SemanticCache '{name}' (model={self.embedding_model}, threshold={self.threshold}, "
+                    f"capacity={self.capacity}, entries={int(self.valid.sum())})")
+
+    async def embed(self, text: str):
+        """Embed text into a normalized float32 vector, or None on failure"""
+        embedding = await self.embedder.embed(text, model=self.embedding_model)
+        if not embedding:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def search(self, queries, k: int) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Batched cosine top-k: returns (indices, scores), each of shape (len(queries), k)"""
+        if self.vectors is None or not self.valid.any():
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.int64), empty
+        scores = np.asarray(queries, dtype=np.float32) @ self.vectors.T
+        scores[:, ~self.valid] = -np.inf
+        k = min(k, int(self.valid.sum()))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    async def lookup(self, question: str) -> Tuple[Optional[str], Optional["np.ndarray"]]:
+        """Return (cached reply or None, question embedding for a later store)"""
+        try:
+            vector = await self.embed(question)
+        except Exception as e:
+            logger.error(f"Error embedding question for semantic cache: {e}")
+            return None, None
+        if vector is None:
+            return None, None
+
+        self._expire()
+        metrics.inc("semantic_cache_lookups_total", cache=self.name)
+        if vector.shape[0] != self.dim and self.dim is not None:
+            logger.error(f"Embedding dimension changed from {self.dim} to {vector.shape[0]}; clearing semantic cache")
+            self.clear()
+            # Reallocated with the new dimension by the next store
+            self.vectors = None
+            self.dim = None
+            return None, vector
+
+        indices, scores = self.search(vector[None, :], self.top_k)
+        if indices.shape[1] and scores[0, 0] >= self.threshold:
+            slot = int(indices[0, 0])
+            self.last_used[slot] = time.time()
+            metrics.inc("semantic_cache_hits_total", cache=self.name)
+            logger.debug("Semantic cache hit (similarity {:.3f} >= {:.3f}) for: {}", float(scores[0, 0]), self.threshold, self.questions[slot])
+            return self.replies[slot], vector
+        return None, vector
+
+    def store(self, question: str, reply: str, vector) -> None:
+        """Store a reply under the question's embedding"""
+        if self.vectors is None:
+            self._allocate(vector.shape[0])
+        slot = self._free_slot()
+        now = time.time()
+        self.vectors[slot] = vector
+        self.valid[slot] = True
+        self.created[slot] = now
+        self.last_used[slot] = now
+        self.replies[slot] = reply
+        self.questions[slot] = question
+        metrics.set_gauge("semantic_cache_entries", int(self.valid.sum()), cache=self.name)
+        self._schedule_save()
+
+    def invalidate(self, prompt_content: str) -> None:
+        """Drop all entries if the prompt they were generated with changed"""
+        new_hash = prompt_hash(prompt_content)
+        if new_hash != self.prompt_hash:
+            self.prompt_hash = new_hash
+            self.clear()
+            logger.info(f"Prompt changed; cleared semantic cache '{self.name}'")
+
+    def clear(self) -> None:
+        self.valid[:] = False
+        self.replies = [None] * self.capacity
+        self.questions = [None] * self.capacity
+        self._schedule_save()
+
+    def _allocate(self, dim: int) -> None:
+        self.dim = dim
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self.vectors = np.lib.format.open_memmap(
+                os.path.join(self.directory, "vectors.npy"), mode="w+", dtype=np.float32, shape=(self.capacity, dim)
+            )
+        else:
+            self.vectors = np.zeros((self.capacity, dim), dtype=np.float32)
+
+    def _free_slot(self) -> int:
+        free = np.flatnonzero(~self.valid)
+        if free.size:
+            return int(free[0])
+        # Full: evict the least recently used entry
+        return int(np.argmin(self.last_used))
+
+    def _expire(self) -> None:
+        expired = self.valid & (self.created < time.time() - self.ttl)
+        if expired.any():
+            self.valid[expired] = False
+            for slot in np.flatnonzero(expired):
+                self.replies[slot] = None
+                self.questions[slot] = None
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    def _load(self) -> None:
+        """Restore a persisted cache if it was built for the same prompt, model and capacity"""
+        if not self.directory or not os.path.exists(self._meta_path()):
+            return
+        try:
+            with open(self._meta_path(), 'r') as f:
+                meta = json.load(f)
+            if (meta.get("prompt_hash") != self.prompt_hash or meta.get("model") != self.embedding_model
+                    or meta.get("capacity") != self.capacity or not meta.get("dim")):
+                logger.info(f"Semantic cache '{self.name}' on disk is stale; starting empty")
+                return
+            self.dim = meta["dim"]
+            self.vectors = np.load(os.path.join(self.directory, "vectors.npy"), mmap_mode="r+")
+            for slot_str, entry in meta["entries"].items():
+                if entry.get("reply") is None:
+                    continue  # Would win every lookup for its question and serve nothing
+                slot = int(slot_str)
+                self.valid[slot] = True
+                self.created[slot] = entry["created"]
+                self.last_used[slot] = entry["last_used"]
+                self.replies[slot] = entry["reply"]
+                self.questions[slot] = entry["question"]
+        except Exception as e:
+            logger.error(f"Error loading semantic cache '{self.name}': {e}")
+            self.valid[:] = False
+            self.dim = None
+            self.vectors = None
+
+    def save(self) -> None:
+        """Flush vectors and write metadata atomically"""
+        if not self.directory or self.vectors is None:
+            return
+        self._write(self._snapshot(), self.vectors)
+
+    def _snapshot(self) -> Dict:
+        """Metadata of the current entries; taken on the loop thread, which is the only one that mutates them"""
+        entries: Dict[str, Dict] = {
+            str(slot): {
+                "created": float(self.created[slot]),
+                "last_used": float(self.last_used[slot]),
+                "reply": self.replies[slot],
+                "question": self.questions[slot],
+            }
+            for slot in np.flatnonzero(self.valid)
+        }
+        return {
+            "prompt_hash": self.prompt_hash,
+            "model": self.embedding_model,
+            "capacity": self.capacity,
+            "dim": self.dim,
+            "entries": entries,
+        }
+
+    def _write(self, meta: Dict, vectors) -> None:
+        if hasattr(vectors, "flush"):
+            vectors.flush()
+        tmp_path = self._meta_path() + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path())
+
+    def _schedule_save(self) -> None:
+        if not self.directory or (self.save_task and not self.save_task.done()):
+            return
+        try:
+            self.save_task = asyncio.get_running_loop().create_task(self._save_later())
+        except RuntimeError:
+            self.save()
+
+    async def _save_later(self) -> None:
+        await asyncio.sleep(SAVE_DELAY_SECONDS)
+        if self.vectors is None:
+            return
+        try:
+            # Only the file writes run in the thread; the loop keeps mutating the entries meanwhile
+            await asyncio.to_thread(self._write, self._snapshot(), self.vectors)
+        except Exception as e:
+            logger.error(f"Error saving semantic cache '{self.name}': {e}")
+
+
+_caches: Dict[str, SemanticCache] = {}
+
+
+def get_semantic_cache(settings: SemanticCacheSettings, embedder, name: str, prompt_content: str) -> SemanticCache:
+    """Return the cache shared by every handler of a character in this process.
+
+    Each cache owns its directory, so platform worker processes (named after
+    their platform by the supervisor) keep theirs under a per-process name.
+    """
+    cache = _caches.get(name)
+    if cache is None:
+        cache_name = name
+        if multiprocessing.parent_process() is not None:
+            cache_name = f"{name}-{multiprocessing.current_process().name}"
+        cache = _caches[name] = SemanticCache(settings, embedder, cache_name, prompt_content)
+    return cache
@@ -1,5 +1,6 @@
-from typing import Dict, List, Optional
-from pydantic import BaseModel
+import os
+from typing import Dict, List, Mapping, Optional, Tuple
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 class Template(BaseModel):
     telegramMessageHandlerTemplate: str
@@ -10,8 +11,234 @@ class Template(BaseModel):
     discordMarketingTemplate: str
 
 class Character(BaseModel):
+    model_config = ConfigDict(extra='allow')
+
     name: str
     username: str
     modelProvider: str
-    templates: Template
+    model: Optional[str] = None
+    triageModel: Optional[str] = None  # Small model for relevance checks; defaults to model
+    replyModel: Optional[str] = None  # Model for replies and escalated checks; defaults to model
+    baseUrl: Optional[str] = None
     clients: List[str]
+    prompt_file: str
+    knowledge_dir: Optional[str] = None
+    inputTokenLimits: Optional[Dict[str, int]] = None
+    semanticCache: bool = False
+    templates: Optional[Template] = None
+
+    @field_validator('clients')
+    @classmethod
+    def check_clients(cls, value: List[str]) -> List[str]:
+        unknown = set(value) - {'telegram', 'discord'}
+        if unknown:
+            raise ValueError(f"unsupported clients: {sorted(unknown)}")
+        return value
+
+
+class GenerationResult(BaseModel):
+    """Generated text plus the usage and timing reported by the backend"""
+    text: str
+    provider: str
+    model: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    latency_seconds: float = 0.0  # Wall clock, including time queued for a concurrency slot
+    load_seconds: Optional[float] = None  # Ollama only: model load, prompt evaluation and generation time
+    prompt_eval_seconds: Optional[float] = None
+    eval_seconds: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.text.startswith("[INTERNAL]")
+
+    @property
+    def compute_seconds(self) -> Optional[float]:
+        """Time the backend spent on the request, when it reports it"""
+        parts = [p for p in (self.load_seconds, self.prompt_eval_seconds, self.eval_seconds) if p is not None]
+        return sum(parts) if parts else None
+
+
+class EnvSettings(BaseModel):
+    """Base for settings groups populated from environment variable names"""
+    model_config = ConfigDict(populate_by_name=True, frozen=True)
+
+
+class MarketingSettings(EnvSettings):
+    message_threshold: int = Field(5, ge=1, alias='MARKETING_MESSAGE_THRESHOLD')
+    time_threshold_hours: float = Field(6.0, gt=0, alias='MARKETING_TIME_THRESHOLD_HOURS')
+    cooldown_hours: float = Field(6.0, ge=0, alias='MARKETING_COOLDOWN_HOURS')
+    activity_threshold: int = Field(10, ge=1, alias='MARKETING_ACTIVITY_THRESHOLD')  # Messages to consider group as active
+    cooldown_reduction: float = Field(0.2, ge=0, alias='MARKETING_COOLDOWN_REDUCTION')  # Hours to reduce from cooldown per activity threshold
+    min_cooldown_hours: float = Field(1.0, ge=0, alias='MARKETING_MIN_COOLDOWN_HOURS')
+    max_length: int = Field(500, ge=1, alias='MARKETING_MAX_LENGTH')
+
+
+class MemorySettings(EnvSettings):
+    enabled: bool = Field(True, alias='MEMORY_ENABLED')
+    turns_per_chat: int = Field(20, ge=1, alias='MEMORY_TURNS_PER_CHAT')  # Ring buffer capacity per chat
+    max_chats: int = Field(5000, ge=1, alias='MEMORY_MAX_CHATS')  # Chats kept before LRU eviction
+    idle_ttl_hours: float = Field(24.0, gt=0, alias='MEMORY_IDLE_TTL_HOURS')
+    context_tokens: int = Field(600, ge=0, alias='MEMORY_CONTEXT_TOKENS')  # Token budget for history in a prompt
+    summary_batch: int = Field(8, ge=1, alias='MEMORY_SUMMARY_BATCH')  # Evicted turns folded per summary update
+    summary_max_chars: int = Field(800, ge=1, alias='MEMORY_SUMMARY_MAX_CHARS')
+
+
+class PromptBudgetSettings(EnvSettings):
+    max_relevance_tokens: int = Field(256, ge=1, alias='PROMPT_MAX_RELEVANCE_TOKENS')
+    max_reply_tokens: int = Field(1024, ge=1, alias='PROMPT_MAX_REPLY_TOKENS')
+    code_block_max_lines: int = Field(12, ge=2, alias='PROMPT_CODE_BLOCK_MAX_LINES')
+
+
+class MetricsSettings(EnvSettings):
+    log_interval_minutes: float = Field(60.0, ge=0, alias='METRICS_LOG_INTERVAL_MINUTES')  # 0 logs metrics only on shutdown
+
+
+class LoopMonitorSettings(EnvSettings):
+    enabled: bool = Field(False, alias='LOOP_MONITOR_ENABLED')
+    interval_ms: float = Field(250, gt=0, alias='LOOP_MONITOR_INTERVAL_MS')
+    threshold_ms: float = Field(200, gt=0, alias='LOOP_MONITOR_THRESHOLD_MS')
+
+
+class PromptReloadSettings(EnvSettings):
+    enabled: bool = Field(True, alias='PROMPT_RELOAD_ENABLED')
+    interval_seconds: float = Field(2.0, gt=0, alias='PROMPT_RELOAD_INTERVAL_SECONDS')  # How often prompt files are checked
+
+
+class DedupSettings(EnvSettings):
+    enabled: bool = Field(True, alias='DEDUP_ENABLED')
+    threshold: float = Field(0.8, gt=0, le=1, alias='DEDUP_THRESHOLD')  # Estimated Jaccard similarity for a match
+    max_entries: int = Field(5000, ge=1, alias='DEDUP_MAX_ENTRIES')
+    ttl_hours: float = Field(6.0, gt=0, alias='DEDUP_TTL_HOURS')
+    reuse_reply: bool = Field(False, alias='DEDUP_REUSE_REPLY')  # Also resend the earlier reply
+
+
+class SemanticCacheSettings(EnvSettings):
+    embedding_model: str = Field('nomic-embed-text', alias='SEMANTIC_CACHE_EMBEDDING_MODEL')  # Ollama embedding model
+    threshold: float = Field(0.92, gt=0, le=1, alias='SEMANTIC_CACHE_THRESHOLD')  # Cosine similarity needed to serve a cached reply
+    capacity: int = Field(2000, ge=1, alias='SEMANTIC_CACHE_CAPACITY')
+    ttl_hours: float = Field(168.0, gt=0, alias='SEMANTIC_CACHE_TTL_HOURS')
+    top_k: int = Field(3, ge=1, alias='SEMANTIC_CACHE_TOP_K')
+    cache_dir: str = Field('.cache/semantic', alias='SEMANTIC_CACHE_DIR')  # Empty keeps the cache in memory only
+
+
+class KnowledgeSettings(EnvSettings):
+    top_k: int = Field(4, ge=1, alias='KNOWLEDGE_TOP_K')  # Chunks added to each prompt
+    chunk_tokens: int = Field(200, ge=20, alias='KNOWLEDGE_CHUNK_TOKENS')
+    index_dir: str = Field('.cache/knowledge', alias='KNOWLEDGE_INDEX_DIR')  # Empty disables the on-disk index cache
+
+
+class CascadeSettings(EnvSettings):
+    confidence_threshold: float = Field(0.7, ge=0, le=1, alias='TRIAGE_CONFIDENCE_THRESHOLD')  # Below this the reply model re-checks
+
+
+class ConcurrencySettings(EnvSettings):
+    enabled: bool = Field(True, alias='LLM_CONCURRENCY_ENABLED')
+    initial_limit: int = Field(4, ge=1, alias='LLM_CONCURRENCY_INITIAL')
+    min_limit: int = Field(1, ge=1, alias='LLM_CONCURRENCY_MIN')
+    max_limit: int = Field(32, ge=1, alias='LLM_CONCURRENCY_MAX')
+    smoothing: float = Field(0.2, gt=0, le=1, alias='LLM_CONCURRENCY_SMOOTHING')  # Weight of each new limit estimate
+
+    @model_validator(mode='after')
+    def check_limits(self) -> 'ConcurrencySettings':
+        if not self.min_limit <= self.initial_limit <= self.max_limit:
+            raise ValueError(f"concurrency limits must satisfy min <= initial <= max, got min={self.min_limit}, "
+                             f"initial={self.initial_limit}, max={self.max_limit}")
+        return self
+
+
+class UsageSettings(EnvSettings):
+    report_interval_minutes: float = Field(60.0, ge=0, alias='USAGE_REPORT_INTERVAL_MINUTES')  # 0 disables periodic summaries
+    prices: Dict[str, Tuple[float, float]] = Field(default_factory=dict, alias='USAGE_PRICES')  # model -> USD per 1M input/output tokens
+
+    @field_validator('prices', mode='before')
+    @classmethod
+    def parse_prices(cls, value):
+        # "model=input/output,model2=input/output"
+        if isinstance(value, str):
+            prices = {}
+            for entry in value.split(','):
+                if not entry.strip():
+                    continue
+                model, _, rates = entry.partition('=')
+                input_rate, _, output_rate = rates.partition('/')
+                prices[model.strip()] = (float(input_rate), float(output_rate or input_rate))
+            return prices
+        return value
+
+
+class MultiprocessSettings(EnvSettings):
+    enabled: bool = Field(False, alias='MULTIPROCESS_ENABLED')  # Platform workers and generation in separate processes
+    socket_path: str = Field('.cache/generation.sock', alias='MULTIPROCESS_SOCKET')
+    max_batch: int = Field(16, ge=1, alias='MULTIPROCESS_MAX_BATCH')  # Frames written per socket flush
+    max_pending: int = Field(32, ge=1, alias='MULTIPROCESS_MAX_PENDING')  # Outstanding requests per worker
+    request_timeout_seconds: float = Field(180.0, gt=0, alias='MULTIPROCESS_REQUEST_TIMEOUT_SECONDS')
+    restart_delay_seconds: float = Field(2.0, gt=0, alias='MULTIPROCESS_RESTART_DELAY_SECONDS')  # Doubled for each quick crash
+
+
+class TelegramSettings(EnvSettings):
+    # Checked by TelegramUserClient, so setups without Telegram can keep the .env.example placeholders
+    api_id: Optional[str] = Field(None, alias='TELEGRAM_API_ID')
+    api_hash: Optional[str] = Field(None, alias='TELEGRAM_API_HASH')
+    phone: Optional[str] = Field(None, alias='TELEGRAM_PHONE')
+    session_name: str = Field('user_session', alias='TELEGRAM_SESSION_NAME')
+    allowed_groups: List[str] = Field(default_factory=list, alias='TELEGRAM_ALLOWED_GROUPS')
+    proxy_host: Optional[str] = Field(None, alias='TELEGRAM_PROXY_HOST')
+    proxy_port: int = Field(1080, alias='TELEGRAM_PROXY_PORT')
+    proxy_username: Optional[str] = Field(None, alias='TELEGRAM_PROXY_USERNAME')
+    proxy_password: Optional[str] = Field(None, alias='TELEGRAM_PROXY_PASSWORD')
+
+    @field_validator('allowed_groups', mode='before')
+    @classmethod
+    def split_groups(cls, value):
+        if isinstance(value, str):
+            return [g.strip() for g in value.split(',') if g.strip()]
+        return value
+
+
+class DiscordSettings(EnvSettings):
+    token: Optional[str] = Field(None, alias='DISCORD_TOKEN')
+
+
+class OllamaSettings(EnvSettings):
+    base_url: str = Field('http://localhost:11434', alias='OLLAMA_BASE_URL')
+    model: str = Field('llama3.3:latest', alias='OLLAMA_MODEL')
+
+
+class GeminiSettings(EnvSettings):
+    api_key: Optional[str] = Field(None, alias='GEMINI_API_KEY')
+
+
+class Settings(EnvSettings):
+    """All agent settings, validated once at startup and passed to every component"""
+    enable_marketing: bool = Field(True, alias='ENABLE_MARKETING')
+    enable_replies: bool = Field(True, alias='ENABLE_REPLIES')
+    enable_debug_logs: bool = Field(False, alias='ENABLE_DEBUG_LOGS')
+    marketing: MarketingSettings = Field(default_factory=MarketingSettings)
+    memory: MemorySettings = Field(default_factory=MemorySettings)
+    prompt_budget: PromptBudgetSettings = Field(default_factory=PromptBudgetSettings)
+    metrics: MetricsSettings = Field(default_factory=MetricsSettings)
+    loop_monitor: LoopMonitorSettings = Field(default_factory=LoopMonitorSettings)
+    prompt_reload: PromptReloadSettings = Field(default_factory=PromptReloadSettings)
+    dedup: DedupSettings = Field(default_factory=DedupSettings)
+    semantic_cache: SemanticCacheSettings = Field(default_factory=SemanticCacheSettings)
+    knowledge: KnowledgeSettings = Field(default_factory=KnowledgeSettings)
+    cascade: CascadeSettings = Field(default_factory=CascadeSettings)
+    concurrency: ConcurrencySettings = Field(default_factory=ConcurrencySettings)
+    usage: UsageSettings = Field(default_factory=UsageSettings)
+    multiprocess: MultiprocessSettings = Field(default_factory=MultiprocessSettings)
+    telegram: TelegramSettings = Field(default_factory=TelegramSettings)
+    discord: DiscordSettings = Field(default_factory=DiscordSettings)
+    ollama: OllamaSettings = Field(default_factory=OllamaSettings)
+    gemini: GeminiSettings = Field(default_factory=GeminiSettings)
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "Settings":
+        """Build settings from environment variables; raises ValidationError on bad values"""
+        env: Dict[str, str] = {k: v for k, v in (environ if environ is not None else os.environ).items() if v != ''}
+        groups = {
+            name: field.annotation.model_validate(env)
+            for name, field in cls.model_fields.items()
+            if isinstance(field.annotation, type) and issubclass(field.annotation, EnvSettings)
+        }
+        return cls.model_validate({**env, **groups})
@@ -0,0 +1,112 @@
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from .metrics import MetricsReporter, metrics
+from .types import GenerationResult, UsageSettings
+
+UsageKey = Tuple[str, str, str, str]  # (character, provider, model, call_type)
+
+
+class UsageTotals:
+    """Cumulative usage for one character/provider/model/call type"""
+    __slots__ = ("calls", "errors", "prompt_tokens", "completion_tokens", "latency_seconds", "compute_seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency_seconds = 0.0
+        self.compute_seconds = 0.0
+
+    def cost(self, rates: Optional[Tuple[float, float]]) -> Optional[float]:
+        if rates is None:
+            return None
+        return (self.prompt_tokens * rates[0] + self.completion_tokens * rates[1]) / 1_000_000
+
+
+class UsageTracker:
+    """Aggregates the usage of every generation call.
+
+    Totals are kept per (character, provider, model, call type) for the
+    periodic summary and mirrored into the metrics registry as counters
+    (llm_calls_total, llm_prompt_tokens_total, llm_completion_tokens_total,
+    llm_compute_seconds_total) plus an llm_latency_seconds observation.
+    """
+
+    def __init__(self):
+        self.totals: Dict[UsageKey, UsageTotals] = {}
+
+    def record(self, result: GenerationResult, character: str, call_type: str) -> None:
+        key = (character or "-", result.provider, result.model or "-", call_type)
+        totals = self.totals.get(key)
+        if totals is None:
+            totals = self.totals[key] = UsageTotals()
+        labels = dict(zip(("character", "provider", "model", "call_type"), key))
+
+        totals.calls += 1
+        totals.latency_seconds += result.latency_seconds
+        metrics.inc("llm_calls_total", **labels)
+        metrics.observe("llm_latency_seconds", result.latency_seconds, **labels)
+        if not result.ok:
+            totals.errors += 1
+            metrics.inc("llm_errors_total", **labels)
+        if result.prompt_tokens:
+            totals.prompt_tokens += result.prompt_tokens
+            metrics.inc("llm_prompt_tokens_total", result.prompt_tokens, **labels)
+        if result.completion_tokens:
+            totals.completion_tokens += result.completion_tokens
+            metrics.inc("llm_completion_tokens_total", result.completion_tokens, **labels)
+        compute = result.compute_seconds
+        if compute:
+            totals.compute_seconds += compute
+            metrics.inc("llm_compute_seconds_total", compute, **labels)
+
+        logger.opt(lazy=True).debug(
+            "LLM usage {}: {} prompt + {} completion tokens in {:.2f}s",
+            lambda: "/".join(key), lambda: result.prompt_tokens, lambda: result.completion_tokens,
+            lambda: result.latency_seconds,
+        )
+
+    def summary_lines(self, prices: Optional[Dict[str, Tuple[float, float]]] = None) -> List[str]:
+        prices = prices or {}
+        lines = []
+        total_cost = 0.0
+        for key, totals in sorted(self.totals.items()):
+            character, provider, model, call_type = key
+            line = (f"{character} {provider}/{model} {call_type}: {totals.calls} calls ({totals.errors} failed), "
+                    f"{totals.prompt_tokens} prompt + {totals.completion_tokens} completion tokens, "
+                    f"avg latency {totals.latency_seconds / totals.calls:.2f}s")
+            if totals.compute_seconds:
+                line += f", compute {totals.compute_seconds:.1f}s"
+            cost = totals.cost(prices.get(model))
+            if cost is not None:
+                total_cost += cost
+                line += f", ${cost:.4f}"
+            lines.append(line)
+        if prices and lines:
+            lines.append(f"Estimated total cost: ${total_cost:.4f}")
+        return lines
+
+    def log_summary(self, prices: Optional[Dict[str, Tuple[float, float]]] = None) -> None:
+        lines = self.summary_lines(prices)
+        if not lines:
+            return
+        logger.info("LLM usage summary:")
+        for line in lines:
+            logger.info(f"  {line}")
+
+
+class UsageReporter(MetricsReporter):
+    """Logs the usage summary on an interval and once more on stop"""
+
+    def __init__(self, settings: UsageSettings, tracker: Optional[UsageTracker] = None):
+        super().__init__(settings.report_interval_minutes)
+        self.prices = settings.prices
+        self.tracker = tracker or usage
+
+    def log(self) -> None:
+        self.tracker.log_summary(self.prices)
+
+
+# Process-wide tracker
+usage = UsageTracker()
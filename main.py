@@ -1,19 +1,93 @@
 import asyncio
 import json
+import multiprocessing
 import signal
 import sys
+import time
 from typing import List, Any, Optional, Dict
 from dotenv import load_dotenv
 import os
 from loguru import logger
 
-from clients.telegram.client import TelegramUserClient
-from clients.discord.client import DiscordClient
-from core.character_manager import CharacterManager
+from clients.worker import run_platform_worker
+from core.character_manager import CharacterManager, PromptWatcher
+from core.generation_service import run_generation_service
+from core.loop_monitor import LoopLagMonitor
+from core.logging_utils import configure_logging
+from core.metrics import MetricsReporter, metrics
+from core.types import Settings
+from core.usage import UsageReporter
+
+QUICK_CRASH_SECONDS = 60  # A process that dies sooner than this has its restart delay doubled
+MAX_RESTART_DELAY_SECONDS = 300
+STOP_TIMEOUT_SECONDS = 10
 
 class GracefulExit(SystemExit):
     pass
 
+class ChildProcess:
+    def __init__(self, name: str, target, args: tuple):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.process: Optional[multiprocessing.Process] = None
+        self.started = 0.0
+        self.delay = 0.0
+        self.restart_at: Optional[float] = None
+
+class ProcessSupervisor:
+    """Runs the multi-process mode's children and restarts any that exit.
+
+    Restarts are delayed by MULTIPROCESS_RESTART_DELAY_SECONDS, doubled for
+    each crash within QUICK_CRASH_SECONDS of starting, so a child that cannot
+    start (bad credentials, service down) does not spin.
+    """
+
+    def __init__(self, restart_delay: float):
+        self.context = multiprocessing.get_context("spawn")
+        self.restart_delay = restart_delay
+        self.children: Dict[str, ChildProcess] = {}
+        self.stopping = False
+
+    def add(self, name: str, target, *args) -> None:
+        self.children[name] = ChildProcess(name, target, args)
+        self._spawn(self.children[name])
+
+    def _spawn(self, child: ChildProcess) -> None:
+        child.process = self.context.Process(target=child.target, args=child.args, name=child.name, daemon=True)
+        child.process.start()
+        child.started = time.monotonic()
+        logger.info(f"Started {child.name} process (pid {child.process.pid})")
+
+    async def run(self):
+        while not self.stopping:
+            await asyncio.sleep(1)
+            now = time.monotonic()
+            for child in self.children.values():
+                if self.stopping or child.process.is_alive():
+                    continue
+                if child.restart_at is None:
+                    quick = now - child.started < QUICK_CRASH_SECONDS
+                    child.delay = min(child.delay * 2, MAX_RESTART_DELAY_SECONDS) if quick and child.delay else self.restart_delay
+                    child.restart_at = now + child.delay
+                    metrics.inc("process_restarts_total", process=child.name)
+                    logger.error(f"{child.name} process exited with code {child.process.exitcode}; "
+                                 f"restarting in {child.delay:.1f}s")
+                elif now >= child.restart_at:
+                    child.restart_at = None
+                    self._spawn(child)
+
+    async def stop(self):
+        self.stopping = True
+        for child in self.children.values():
+            if child.process.is_alive():
+                child.process.terminate()
+        for child in self.children.values():
+            await asyncio.to_thread(child.process.join, STOP_TIMEOUT_SECONDS)
+            if child.process.is_alive():
+                logger.warning(f"{child.name} process did not stop in time; killing it")
+                child.process.kill()
+
 class AgentManager:
     def __init__(self):
         self.telegram_client = None
@@ -21,12 +95,20 @@ class AgentManager:
         self.tasks: List[asyncio.Task] = []
         self.shutdown_event = asyncio.Event()
         self.loop = None
+        self.loop_monitor: Optional[LoopLagMonitor] = None
+        self.metrics_reporter: Optional[MetricsReporter] = None
+        self.prompt_watcher: Optional[PromptWatcher] = None
+        self.usage_reporter: Optional[UsageReporter] = None
+        self.supervisor: Optional[ProcessSupervisor] = None
         # Load environment variables, removing comments
         from dotenv import dotenv_values
         dotenv_dict = dotenv_values(".env")
         for key, value in dotenv_dict.items():
             if value is not None:
                 os.environ[key] = value
+        # Validated once, after .env is applied, and passed to every component
+        self.settings = Settings.from_env()
+        configure_logging(self.settings)
 
     def setup_signal_handlers(self):
         for sig in (signal.SIGTERM, signal.SIGINT):
@@ -41,6 +123,22 @@ class AgentManager:
 
         self.shutdown_event.set()
 
+        if self.loop_monitor:
+            self.loop_monitor.stop()
+
+        if self.metrics_reporter:
+            self.metrics_reporter.stop()
+
+        if self.prompt_watcher:
+            self.prompt_watcher.stop()
+
+        if self.usage_reporter:
+            self.usage_reporter.stop()
+
+        if self.supervisor:
+            logger.info("Stopping worker processes...")
+            await self.supervisor.stop()
+
         # Close Discord client
         if self.discord_client:
             logger.info("Closing Discord client...")
@@ -63,6 +161,38 @@ class AgentManager:
             self.loop.stop()
         raise GracefulExit()
 
+    def start_prompt_watcher(self):
+        """Reload prompt files into the running message handlers when they change"""
+        self.prompt_watcher = PromptWatcher(self.settings.prompt_reload.interval_seconds)
+        for client in (self.telegram_client, self.discord_client):
+            if client:
+                handler = client.message_manager.message_handler
+                self.prompt_watcher.watch(handler.prompt_file, handler.update_prompt)
+        self.prompt_watcher.start()
+
+    def start_workers(self, character: Dict) -> bool:
+        """Run generation and each platform client in its own process under a supervisor"""
+        platforms = []
+        if "telegram" in character["clients"]:
+            # Workers have no terminal for the login code, so the session must already exist
+            session_file = os.path.join('sessions', f"{self.settings.telegram.session_name}.session")
+            if os.path.exists(session_file):
+                platforms.append("telegram")
+            else:
+                logger.error("No Telegram session found; run once with MULTIPROCESS_ENABLED=false to log in")
+        if "discord" in character["clients"]:
+            platforms.append("discord")
+        if not platforms:
+            logger.error("No platform workers to start")
+            return False
+
+        self.supervisor = ProcessSupervisor(self.settings.multiprocess.restart_delay_seconds)
+        self.supervisor.add("generation", run_generation_service, character, self.settings)
+        for platform in platforms:
+            self.supervisor.add(platform, run_platform_worker, platform, character, self.settings)
+        self.tasks.append(asyncio.create_task(self.supervisor.run()))
+        return True
+
     def select_character(self) -> Optional[Dict]:
         """Select a character to use for the agent"""
         character_manager = CharacterManager()
@@ -82,10 +212,27 @@ class AgentManager:
                 
             logger.info(f"Selected character: {character['name']}")
 
-            # Initialize clients based on character configuration
+            self.metrics_reporter = MetricsReporter(self.settings.metrics.log_interval_minutes)
+            self.metrics_reporter.start()
+
+            # Started after the interactive selection, which blocks the loop on input()
+            if self.settings.loop_monitor.enabled:
+                self.loop_monitor = LoopLagMonitor(self.settings.loop_monitor.interval_ms, self.settings.loop_monitor.threshold_ms)
+                self.loop_monitor.start()
+
+            if self.settings.multiprocess.enabled:
+                if not self.start_workers(character):
+                    await self.shutdown()
+                    return
+                await self.shutdown_event.wait()
+                return
+
+            # Initialize clients based on character configuration. The platform libraries are imported
+            # here rather than at module level because spawned workers re-import this module
             if "telegram" in character["clients"]:
                 try:
-                    self.telegram_client = TelegramUserClient(character=character)
+                    from clients.telegram.client import TelegramUserClient
+                    self.telegram_client = TelegramUserClient(character=character, settings=self.settings)
                     self.tasks.append(asyncio.create_task(self.telegram_client.start()))
                     logger.info("Telegram user client initialized")
                 except Exception as e:
@@ -93,8 +240,9 @@ class AgentManager:
 
             if "discord" in character["clients"]:
                 try:
-                    self.discord_client = DiscordClient(character=character)
-                    self.tasks.append(asyncio.create_task(self.discord_client.start(os.getenv("DISCORD_TOKEN"))))
+                    from clients.discord.client import DiscordClient
+                    self.discord_client = DiscordClient(character=character, settings=self.settings)
+                    self.tasks.append(asyncio.create_task(self.discord_client.start(self.settings.discord.token)))
                     logger.info("Discord user client initialized")
                 except Exception as e:
                     logger.error(f"Failed to initialize Discord client: {e}")
@@ -104,6 +252,12 @@ class AgentManager:
                 await self.shutdown()
                 return
 
+            if self.settings.prompt_reload.enabled:
+                self.start_prompt_watcher()
+
+            self.usage_reporter = UsageReporter(self.settings.usage)
+            self.usage_reporter.start()
+
             # Wait for shutdown signal
             await self.shutdown_event.wait()
 
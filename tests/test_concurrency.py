@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from core.concurrency import DROP_BACKOFF, AdaptiveConcurrencyLimiter
+from core.generation import GenerationManager
+from core.types import ConcurrencySettings
+
+
+def run_calls(limiter: AdaptiveConcurrencyLimiter, rtt: float, count: int, key: str = "default") -> None:
+    """Complete calls while the limit is saturated, so the limiter is allowed to grow"""
+    for _ in range(count):
+        limiter.in_flight = int(limiter.limit) + 1
+        limiter.release(rtt, key=key)
+
+
+def test_limit_grows_while_latency_stays_at_baseline():
+    limiter = AdaptiveConcurrencyLimiter(ConcurrencySettings(initial_limit=4, max_limit=32))
+    run_calls(limiter, 1.0, 50)
+    assert limiter.limit > 8
+
+
+def test_limit_does_not_grow_when_underused():
+    limiter = AdaptiveConcurrencyLimiter(ConcurrencySettings(initial_limit=4))
+    for _ in range(50):
+        limiter.in_flight = 1
+        limiter.release(1.0)
+    assert limiter.limit == 4
+
+
+def test_limit_shrinks_when_latency_rises():
+    limiter = AdaptiveConcurrencyLimiter(ConcurrencySettings(initial_limit=16, max_limit=32))
+    run_calls(limiter, 1.0, 20)
+    grown = limiter.limit
+    run_calls(limiter, 1.9, 20)
+    assert limiter.limit < grown
+
+
+def test_limit_stays_within_bounds():
+    limiter = AdaptiveConcurrencyLimiter(ConcurrencySettings(initial_limit=2, min_limit=2, max_limit=6))
+    run_calls(limiter, 1.0, 100)
+    assert limiter.limit == 6
+    for _ in range(100):
+        limiter.in_flight = 1
+        limiter.release(1.0, success=False)
+    assert limiter.limit == 2
+
+
+def test_failure_backs_off_multiplicatively():
+    limiter = AdaptiveConcurrencyLimiter(ConcurrencySettings(initial_limit=10))
+    limiter.in_flight = 1
+    limiter.release(1.0, success=False)
+    assert limiter.limit == pytest.approx(10 * DROP_BACKOFF)
+
+
+def test_release_without_a_sample_keeps_the_limit():
+    limiter = AdaptiveConcurrencyLimiter(ConcurrencySettings(initial_limit=10))
+    limiter.in_flight = 1
+    limiter.release(None)
+    assert limiter.limit == 10 and limiter.in_flight == 0
+
+
+def test_mixed_call_types_do_not_ratchet_the_limit_down():
+    limiter = AdaptiveConcurrencyLimiter(ConcurrencySettings(initial_limit=8, max_limit=32))
+    for _ in range(50):
+        run_calls(limiter, 0.1, 1, key="small/relevance")
+        run_calls(limiter, 3.0, 1, key="large/reply")
+    # Each kind of call is steady against its own baseline, so this grows like uniform traffic
+    assert limiter.limit == 32
+
+
+def test_waiters_are_served_in_order():
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter(ConcurrencySettings(initial_limit=1))
+        order = []
+
+        async def call(i):
+            await limiter.acquire()
+            order.append(i)
+            await asyncio.sleep(0)
+            limiter.release(None)
+
+        await asyncio.gather(*(call(i) for i in range(5)))
+        return order, limiter.in_flight
+
+    order, in_flight = asyncio.run(scenario())
+    assert order == [0, 1, 2, 3, 4]
+    assert in_flight == 0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter(ConcurrencySettings(initial_limit=1))
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        limiter.release(None)
+        return limiter.in_flight, len(limiter.waiters)
+
+    assert asyncio.run(scenario()) == (0, 0)
+
+
+@pytest.mark.parametrize("limits", [
+    {"initial_limit": 40, "max_limit": 32},
+    {"initial_limit": 2, "min_limit": 4},
+])
+def test_settings_reject_inconsistent_limits(limits):
+    with pytest.raises(ValidationError):
+        ConcurrencySettings(**limits)
+
+
+class SlowGenerator:
+    async def generate(self, context, model=None, personality=""):
+        await asyncio.sleep(10)
+
+
+class SlowManager(GenerationManager):
+    def _initialize_generator(self):
+        return SlowGenerator()
+
+
+def test_cancelled_generation_is_not_counted_as_a_failure():
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter(ConcurrencySettings(initial_limit=4))
+        manager = SlowManager(model_provider="test", limiter=limiter)
+        task = asyncio.create_task(manager.generate("hello"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from core.conversation_memory import ASSISTANT_ROLE, USER_ROLE, ConversationMemory, RingBuffer
+from core.types import MemorySettings
+
+
+class FakeSummarizer:
+    """Stands in for GenerationManager; answers summary prompts with a canned response"""
+
+    def __init__(self, response="summary of the chat"):
+        self.response = response
+        self.prompts = []
+        self.release = None  # Set to an asyncio.Event to hold calls until it is set
+
+    async def generate_text(self, prompt, model=None, personality="", call_type="other"):
+        self.prompts.append(prompt)
+        if self.release is not None:
+            await self.release.wait()
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+@pytest.fixture
+def summarizer():
+    return FakeSummarizer()
+
+
+@pytest.fixture
+def settings():
+    return MemorySettings(turns_per_chat=3, summary_batch=2, max_chats=10)
+
+
+def test_ring_buffer_overwrites_oldest():
+    buffer = RingBuffer(3)
+    assert [buffer.append(i) for i in range(5)] == [None, None, None, 0, 1]
+    assert list(buffer) == [2, 3, 4]
+    assert list(buffer.newest_first()) == [4, 3, 2]
+    assert len(buffer) == 3
+
+
+def test_ring_buffer_rejects_zero_capacity():
+    with pytest.raises(ValueError):
+        RingBuffer(0)
+
+
+def test_context_keeps_recent_turns_in_order(summarizer, settings):
+    memory = ConversationMemory(summarizer, settings)
+    memory.record(1, USER_ROLE, "hello")
+    memory.record(1, ASSISTANT_ROLE, "hi there")
+    assert memory.build_context(1) == "User: hello\nYou: hi there"
+    assert memory.build_context(2) == ""
+
+
+def test_context_drops_oldest_turns_over_the_token_budget(summarizer, settings):
+    memory = ConversationMemory(summarizer, settings)
+    memory.record(1, USER_ROLE, "an older message " * 20)
+    memory.record(1, USER_ROLE, "latest")
+    assert memory.build_context(1, max_tokens=10) == "User: latest"
+
+
+def test_evicted_turns_are_summarized():
+    async def scenario(summarizer, settings):
+        memory = ConversationMemory(summarizer, settings)
+        for i in range(5):
+            memory.record(1, USER_ROLE, f"message {i}")
+        await memory.chats[1].summary_task
+        return memory
+
+    summarizer = FakeSummarizer()
+    memory = asyncio.run(scenario(summarizer, MemorySettings(turns_per_chat=3, summary_batch=2)))
+    assert "User: message 0\nUser: message 1" in summarizer.prompts[0]
+    assert memory.chats[1].pending == []
+    assert memory.build_context(1).startswith("Summary of earlier conversation: summary of the chat\n\nUser: message 2")
+
+
+def test_turns_evicted_during_a_summary_are_kept():
+    async def scenario(summarizer, settings):
+        summarizer.release = asyncio.Event()
+        memory = ConversationMemory(summarizer, settings)
+        for i in range(5):
+            memory.record(1, USER_ROLE, f"message {i}")
+        await asyncio.sleep(0)  # The summary task takes its batch and waits on the model
+        for i in range(5, 7):
+            memory.record(1, USER_ROLE, f"message {i}")
+        summarizer.release.set()
+        await memory.chats[1].summary_task
+        return [turn.text for turn in memory.chats[1].pending]
+
+    pending = asyncio.run(scenario(FakeSummarizer(), MemorySettings(turns_per_chat=3, summary_batch=2)))
+    assert pending == ["message 2", "message 3"]
+
+
+@pytest.mark.parametrize("response", ["[INTERNAL] model unavailable", RuntimeError("boom")])
+def test_failed_summary_restores_the_batch(response):
+    async def scenario(summarizer, settings):
+        memory = ConversationMemory(summarizer, settings)
+        for i in range(5):
+            memory.record(1, USER_ROLE, f"message {i}")
+        await memory.chats[1].summary_task
+        return memory.chats[1]
+
+    chat = asyncio.run(scenario(FakeSummarizer(response), MemorySettings(turns_per_chat=3, summary_batch=2)))
+    assert chat.summary == ""
+    assert [turn.text for turn in chat.pending] == ["message 0", "message 1"]
+
+
+def test_least_recently_active_chat_is_evicted(summarizer):
+    memory = ConversationMemory(summarizer, MemorySettings(max_chats=2))
+    memory.record(1, USER_ROLE, "one")
+    memory.record(2, USER_ROLE, "two")
+    memory.record(1, USER_ROLE, "one again")
+    memory.record(3, USER_ROLE, "three")
+    assert list(memory.chats) == [1, 3]
+
+
+def test_idle_chats_are_evicted(summarizer, settings):
+    memory = ConversationMemory(summarizer, settings)
+    memory.record(1, USER_ROLE, "old")
+    memory.chats[1].last_active -= memory.idle_ttl + 1
+    memory.record(2, USER_ROLE, "new")
+    assert list(memory.chats) == [2]
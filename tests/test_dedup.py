@@ -0,0 +1,85 @@
+import pytest
+
+import core.dedup
+from core.dedup import MAX_CHARS, NearDuplicateIndex, normalize, signature, similarity
+from core.types import DedupSettings
+
+QUESTION = "Does anyone know a good AI tool that can write unit tests for a large Python project?"
+
+
+@pytest.fixture
+def index():
+    return NearDuplicateIndex(DedupSettings(), name="test")
+
+
+def test_normalize_strips_links_mentions_and_punctuation():
+    assert normalize("Hey @bob, see https://example.com/x!!! 🚀") == "hey see"
+
+
+def test_lightly_edited_message_matches(index):
+    index.add(QUESTION, relevant=True)
+    entry = index.match("@alice does anyone know a good AI tool that can write unit tests for a large python project??")
+    assert entry is not None and entry.relevant
+
+
+def test_different_message_does_not_match(index):
+    index.add(QUESTION, relevant=True)
+    assert index.match("What time is the standup meeting tomorrow, and who is running it?") is None
+
+
+def test_threshold_controls_matching():
+    edited = QUESTION.replace("large Python project", "small Rust library")
+    score = similarity(signature(QUESTION), signature(edited))
+    assert 0 < score < 1
+
+    strict = NearDuplicateIndex(DedupSettings(threshold=min(1.0, score + 0.05)), name="test")
+    strict.add(QUESTION, relevant=True)
+    assert strict.match(edited) is None
+
+    loose = NearDuplicateIndex(DedupSettings(threshold=max(0.05, score - 0.05)), name="test")
+    loose.add(QUESTION, relevant=True)
+    assert loose.match(edited) is not None
+
+
+def test_empty_and_short_messages_are_not_indexed_or_matched(index):
+    for text in ("", "https://example.com/a", "@someone", "🔥🔥🔥", "hi there"):
+        assert signature(text) is None
+        assert index.add(text, relevant=False) is None
+        assert index.match(text) is None
+    assert not index.entries
+
+    # A bare link must not reuse the verdict of a different bare link
+    index.add("https://example.com/a", relevant=True)
+    assert index.match("https://example.com/b") is None
+
+
+def test_long_input_is_capped():
+    filler = "word " * (MAX_CHARS // 5)
+    assert signature(filler + "one ending") == signature(filler + "a completely different ending")
+
+
+def test_set_reply_and_clear(index):
+    index.add(QUESTION, relevant=True)
+    index.set_reply(QUESTION, "Try our tool")
+    assert index.match(QUESTION).reply == "Try our tool"
+    index.set_reply("ok", "ignored")
+
+    index.clear()
+    assert index.match(QUESTION) is None
+
+
+def test_oldest_entries_are_evicted():
+    index = NearDuplicateIndex(DedupSettings(max_entries=2), name="test")
+    messages = [f"message number {word} about the deployment pipeline" for word in ("one", "two", "three")]
+    for message in messages:
+        index.add(message, relevant=True)
+    assert len(index.entries) == 2
+    assert signature(messages[0]) not in index.entries
+
+
+def test_vectorized_signature_matches_the_python_one(monkeypatch):
+    pytest.importorskip("numpy")
+    text = "does anyone know a good tool for writing unit tests in python and rust"
+    vectorized = signature.__wrapped__(text)
+    monkeypatch.setattr(core.dedup, "np", None)
+    assert signature.__wrapped__(text) == vectorized
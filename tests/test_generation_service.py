@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+from core.generation_service import (
+    MAX_FRAME_BYTES, HEADER, GenerationService, RemoteGenerationManager, encode_frame, read_frame, write_frames,
+)
+from core.types import GenerationResult, MultiprocessSettings
+
+
+class EchoGenerationManager:
+    """Stands in for the service's GenerationManager; echoes the context back"""
+
+    async def generate(self, context, model=None, personality="", call_type="other"):
+        return GenerationResult(text=f"echo: {context}", provider="ollama", model=model, prompt_tokens=3)
+
+
+class FakeWriter:
+    def __init__(self):
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(data)
+
+    async def drain(self):
+        pass
+
+
+@pytest.fixture
+def settings(tmp_path):
+    return MultiprocessSettings(socket_path=str(tmp_path / "gen.sock"), request_timeout_seconds=5)
+
+
+@pytest.fixture
+def character():
+    return {"name": "test", "modelProvider": "ollama", "model": "llama3"}
+
+
+def reader_for(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+async def wait_until(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met")
+
+
+def test_frames_round_trip():
+    async def scenario():
+        reader = reader_for(encode_frame({"id": 1, "text": "héllo"}) + encode_frame({"id": 2}))
+        return [await read_frame(reader) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [{"id": 1, "text": "héllo"}, {"id": 2}, None]
+
+
+def test_frame_cut_short_is_an_error():
+    async def scenario():
+        await read_frame(reader_for(encode_frame({"id": 1})[:-2]))
+
+    with pytest.raises(asyncio.IncompleteReadError):
+        asyncio.run(scenario())
+
+
+def test_oversized_frame_is_rejected():
+    async def scenario():
+        await read_frame(reader_for(HEADER.pack(MAX_FRAME_BYTES + 1)))
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(scenario())
+
+
+def test_queued_frames_are_coalesced_into_batches():
+    async def scenario():
+        writer = FakeWriter()
+        outgoing = asyncio.Queue()
+        for i in range(5):
+            outgoing.put_nowait({"id": i})
+        task = asyncio.create_task(write_frames(writer, outgoing, max_batch=2))
+        await wait_until(outgoing.empty)
+        await asyncio.sleep(0)
+        task.cancel()
+        return writer.writes
+
+    writes = asyncio.run(scenario())
+    assert writes == [encode_frame({"id": 0}) + encode_frame({"id": 1}),
+                      encode_frame({"id": 2}) + encode_frame({"id": 3}),
+                      encode_frame({"id": 4})]
+
+
+def test_requests_are_served_over_the_socket(settings, character):
+    async def scenario():
+        service = GenerationService(EchoGenerationManager(), settings)
+        await service.start()
+        manager = RemoteGenerationManager(settings, character)
+        try:
+            return await asyncio.gather(*(manager.generate(f"message {i}", model="llama3") for i in range(3)))
+        finally:
+            await manager.close()
+            service.stop()
+
+    results = asyncio.run(scenario())
+    assert [result.text for result in results] == ["echo: message 0", "echo: message 1", "echo: message 2"]
+    assert results[0].prompt_tokens == 3
+
+
+def test_manager_reconnects_after_the_service_drops_the_connection(settings, character):
+    connections = []
+
+    async def answer_once_and_hang_up(reader, writer):
+        connections.append(writer)
+        request = await read_frame(reader)
+        result = GenerationResult(text=f"reply {len(connections)}", provider="ollama")
+        writer.write(encode_frame({"id": request["id"], "result": result.model_dump()}))
+        await writer.drain()
+        writer.close()
+
+    async def scenario():
+        server = await asyncio.start_unix_server(answer_once_and_hang_up, path=settings.socket_path)
+        manager = RemoteGenerationManager(settings, character)
+        try:
+            first = await manager.generate("hello")
+            await wait_until(lambda: not manager.connected)
+            second = await manager.generate("hello again")
+            return first.text, second.text
+        finally:
+            await manager.close()
+            server.close()
+
+    assert asyncio.run(scenario()) == ("reply 1", "reply 2")
+    assert len(connections) == 2
+
+
+def test_pending_calls_fail_when_the_service_goes_away(settings, character):
+    async def hang_up(reader, writer):
+        await read_frame(reader)
+        writer.close()
+
+    async def scenario():
+        server = await asyncio.start_unix_server(hang_up, path=settings.socket_path)
+        manager = RemoteGenerationManager(settings, character)
+        try:
+            return await manager.generate("hello")
+        finally:
+            await manager.close()
+            server.close()
+
+    result = asyncio.run(scenario())
+    assert not result.ok
+    assert result.model == "llama3"
@@ -0,0 +1,87 @@
+import pytest
+
+from core.knowledge import KnowledgeBase, split_chunks, tokenize
+from core.prompt_budget import estimate_tokens
+from core.types import KnowledgeSettings
+
+DOCS = {
+    "terminal.md": "The assistant can run terminal commands and read the output of your build.",
+    "models.md": "Plug in any model: Claude, GPT or a local model served by Ollama.",
+    "browser.md": "Browser automation lets the assistant click through your web app while coding.",
+    "pricing.txt": "The extension is free. Model usage is billed by the provider of the model.",
+}
+
+
+def write_docs(directory, docs):
+    directory.mkdir()
+    for name, text in docs.items():
+        (directory / name).write_text(text)
+    return str(directory)
+
+
+@pytest.fixture
+def docs_dir(tmp_path):
+    return write_docs(tmp_path / "docs", DOCS)
+
+
+@pytest.fixture
+def settings(tmp_path):
+    return KnowledgeSettings(index_dir=str(tmp_path / "index"))
+
+
+def test_tokenize_drops_stopwords():
+    assert tokenize("How do I run the Tests?") == ["do", "run", "tests"]
+
+
+def test_split_chunks_respects_the_token_cap():
+    paragraphs = "\n\n".join(f"Paragraph {i} has a few words in it." for i in range(20))
+    chunks = split_chunks(paragraphs, max_tokens=30)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 30 for chunk in chunks)
+    assert "Paragraph 0" in chunks[0] and "Paragraph 19" in chunks[-1]
+
+
+def test_split_chunks_splits_long_paragraphs_by_sentence():
+    paragraph = " ".join(f"Sentence number {i} is here." for i in range(30))
+    chunks = split_chunks(paragraph, max_tokens=40)
+    assert len(chunks) > 1
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+
+def test_bm25_ranks_the_matching_chunk_first(docs_dir, settings):
+    knowledge = KnowledgeBase(docs_dir, settings)
+    results = knowledge.search("can it run terminal commands?")
+    assert results[0][1]["source"] == "terminal.md"
+
+    results = knowledge.search("which model providers can I plug in")
+    assert results[0][1]["source"] == "models.md"
+    assert [score for score, _ in results] == sorted((score for score, _ in results), reverse=True)
+
+
+def test_rare_terms_outweigh_common_ones(tmp_path, settings):
+    docs = {f"common{i}.md": "assistant assistant assistant coding" for i in range(5)}
+    docs["rare.md"] = "assistant kubernetes"
+    knowledge = KnowledgeBase(write_docs(tmp_path / "docs", docs), settings)
+    assert knowledge.search("assistant kubernetes")[0][1]["source"] == "rare.md"
+
+
+def test_unrelated_query_returns_nothing(docs_dir, settings):
+    knowledge = KnowledgeBase(docs_dir, settings)
+    assert knowledge.search("lol") == []
+    assert knowledge.context_for("the and of") == ""
+
+
+def test_top_k_limits_the_context(docs_dir):
+    knowledge = KnowledgeBase(docs_dir, KnowledgeSettings(index_dir="", top_k=1))
+    context = knowledge.context_for("assistant model")
+    assert context.startswith("Relevant knowledge:\n")
+    assert len(knowledge.search("assistant model")) == 1
+
+
+def test_index_is_reused_from_the_cache(tmp_path, docs_dir, settings):
+    first = KnowledgeBase(docs_dir, settings)
+    assert len(list((tmp_path / "index").iterdir())) == 1
+
+    cached = KnowledgeBase(docs_dir, settings)
+    assert cached.chunks == first.chunks
+    assert cached.search("terminal")[0][1]["source"] == "terminal.md"
@@ -0,0 +1,23 @@
+import asyncio
+import time
+
+from core.loop_monitor import LoopLagMonitor
+from core.metrics import metrics
+
+
+def test_blocking_call_is_measured_and_reported():
+    async def scenario():
+        monitor = LoopLagMonitor(interval_ms=20, threshold_ms=50)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # Block the loop
+        await asyncio.sleep(0.05)
+        monitor.stop()
+
+    stalls = metrics.get_counter("event_loop_stalls_total")
+    dumps = metrics.get_counter("event_loop_blocking_dumps_total")
+    asyncio.run(scenario())
+
+    assert metrics.get_counter("event_loop_stalls_total") == stalls + 1
+    assert metrics.get_counter("event_loop_blocking_dumps_total") == dumps + 1
+    assert metrics.snapshot()["event_loop_lag_seconds"]["max"] >= 0.15
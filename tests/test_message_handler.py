@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from core.message_handler import MessageHandler, parse_relevance
+from core.types import Settings
+
+
+class FakeGenerationManager:
+    """Stands in for GenerationManager; answers relevance prompts per model"""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.models = []
+
+    async def generate_text(self, prompt, model=None, personality="", call_type="other"):
+        self.models.append(model)
+        return self.answers[model]
+
+
+@pytest.fixture
+def prompt_file(tmp_path):
+    path = tmp_path / "prompt.txt"
+    path.write_text("You answer questions about the project.")
+    return str(path)
+
+
+@pytest.fixture
+def settings():
+    return Settings.from_env({"ENABLE_MARKETING": "false", "DEDUP_ENABLED": "false"})
+
+
+@pytest.mark.parametrize("response, expected", [
+    ("yes 0.9", (True, 0.9)),
+    ("no", (False, None)),
+    ("Yes.", (True, None)),
+    ("no 1", (False, 1.0)),
+    ("no, yesterday it was fine", (False, None)),
+    ("eyes", (False, 0.0)),
+    ("yes or no, 0.8", (True, 0.0)),
+    ("no... well, yes", (True, 0.0)),
+])
+def test_parse_relevance(response, expected):
+    assert parse_relevance(response) == expected
+
+
+@pytest.mark.parametrize("triage_answer, escalated, relevant", [
+    ("no 0.3", True, True),
+    ("yes", True, True),
+    ("no 0.9", False, False),
+])
+def test_uncertain_triage_escalates_to_the_reply_model(prompt_file, settings, triage_answer, escalated, relevant):
+    manager = FakeGenerationManager({"small": triage_answer, "large": "yes 0.95"})
+    character = {"name": "test", "triageModel": "small", "replyModel": "large"}
+    handler = MessageHandler(prompt_file, character, settings, generation_manager=manager)
+
+    assert asyncio.run(handler._is_relevant("when is the next release?")) is relevant
+    assert manager.models == (["small", "large"] if escalated else ["small"])
+    assert handler.escalation_count == int(escalated)
+
+
+def test_same_model_is_never_asked_twice(prompt_file, settings):
+    manager = FakeGenerationManager({"small": "yes 0.2"})
+    character = {"name": "test", "triageModel": "small", "replyModel": "small"}
+    handler = MessageHandler(prompt_file, character, settings, generation_manager=manager)
+
+    assert asyncio.run(handler._is_relevant("when is the next release?")) is True
+    assert manager.models == ["small"]
+
+
+def test_failed_escalation_keeps_the_triage_verdict(prompt_file, settings):
+    manager = FakeGenerationManager({"small": "yes 0.4", "large": "[INTERNAL] model unavailable"})
+    character = {"name": "test", "triageModel": "small", "replyModel": "large"}
+    handler = MessageHandler(prompt_file, character, settings, generation_manager=manager)
+
+    assert asyncio.run(handler._is_relevant("when is the next release?")) is True
+
+
+def test_marketing_text_is_reported_as_marketing(prompt_file):
+    settings = Settings.from_env({"MARKETING_MESSAGE_THRESHOLD": "1", "DEDUP_ENABLED": "false"})
+    manager = FakeGenerationManager({None: "Try NeuronLink today", "small": "no 0.9"})
+    character = {"name": "test", "triageModel": "small", "replyModel": "small"}
+    handler = MessageHandler(prompt_file, character, settings, generation_manager=manager)
+
+    async def scenario():
+        return [await handler.respond("hello there", chat_id=1) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [("Try NeuronLink today", True), (None, False)]
@@ -0,0 +1,39 @@
+import asyncio
+
+from loguru import logger
+
+from core.metrics import MetricsRegistry, MetricsReporter
+
+
+def test_snapshot_formats_labels_and_observations():
+    registry = MetricsRegistry()
+    registry.inc("calls_total", backend="ollama")
+    registry.inc("calls_total", 2, backend="ollama")
+    registry.set_gauge("limit", 4)
+    for value in (1.0, 2.0, 3.0):
+        registry.observe("latency_seconds", value)
+
+    snapshot = registry.snapshot()
+    assert snapshot["calls_total{backend=ollama}"] == 3
+    assert snapshot["limit"] == 4
+    assert snapshot["latency_seconds"] == {"count": 3, "avg": 2.0, "p50": 2.0, "p99": 3.0, "max": 3.0}
+
+
+def test_reporter_logs_the_registry_periodically_and_on_stop():
+    registry = MetricsRegistry()
+    registry.inc("events_total")
+    lines = []
+    sink = logger.add(lines.append, format="{message}")
+
+    async def scenario():
+        reporter = MetricsReporter(0.001, registry)  # Every 60ms
+        reporter.start()
+        await asyncio.sleep(0.15)
+        reporter.stop()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        logger.remove(sink)
+    logged = [line for line in lines if line.startswith("metric events_total = 1")]
+    assert len(logged) >= 3
@@ -0,0 +1,71 @@
+from core.metrics import metrics
+from core.prompt_budget import (
+    TRUNCATION_MARKER, PromptBudget, collapse_code_blocks, estimate_tokens, truncate_head_tail,
+)
+from core.types import PromptBudgetSettings
+
+
+def test_estimate_tokens_counts_non_ascii_per_character():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a" * 40) == 11
+    assert estimate_tokens("日本語") == 4
+
+
+def test_short_text_is_unchanged():
+    budget = PromptBudget("default", PromptBudgetSettings(), limits={"test_short": 50})
+    assert budget.fit("hello there", "test_short") == "hello there"
+    assert metrics.get_counter("prompt_truncations_total", profile="test_short") == 0
+
+
+def test_long_text_fits_the_cap_and_keeps_head_and_tail():
+    budget = PromptBudget("default", PromptBudgetSettings(), limits={"test_long": 50})
+    text = "start " + "filler words " * 200 + "the end"
+    fitted = budget.fit(text, "test_long")
+
+    assert budget.estimate(fitted) <= 50
+    assert fitted.startswith("start ")
+    assert fitted.endswith("the end")
+    assert TRUNCATION_MARKER in fitted
+    assert metrics.get_counter("prompt_truncations_total", profile="test_long") == 1
+    assert metrics.get_gauge("prompt_truncation_rate", profile="test_long") == 1.0
+
+
+def test_truncation_rate_is_per_profile():
+    budget = PromptBudget("default", PromptBudgetSettings(), limits={"test_rate": 20})
+    budget.fit("short", "test_rate")
+    budget.fit("word " * 100, "test_rate")
+    assert budget.truncation_rate["test_rate"] == 0.5
+    assert metrics.get_gauge("prompt_truncation_rate", profile="test_rate") == 0.5
+
+
+def test_unknown_profile_is_not_capped():
+    budget = PromptBudget("default", PromptBudgetSettings())
+    text = "word " * 1000
+    assert budget.fit(text, "test_unlimited") == text
+
+
+def test_long_code_blocks_are_collapsed_before_truncating():
+    code = "\n".join(f"line {i}" for i in range(40))
+    text = f"look at this\n```python\n{code}\n```\nthanks"
+    collapsed = collapse_code_blocks(text, max_lines=6)
+
+    assert "line 0" in collapsed and "line 39" in collapsed
+    assert "line 20" not in collapsed
+    assert "[... 34 lines omitted ...]" in collapsed
+    assert collapsed.startswith("look at this\n```python\n")
+    assert collapsed.endswith("```\nthanks")
+
+
+def test_short_code_blocks_are_kept():
+    text = "```\na\nb\n```"
+    assert collapse_code_blocks(text, max_lines=6) == text
+
+
+def test_truncate_head_tail_cuts_at_whitespace():
+    text = " ".join(f"word{i}" for i in range(100))
+    truncated = truncate_head_tail(text, 100)
+
+    assert len(truncated) <= 100
+    head, tail = truncated.split(TRUNCATION_MARKER)
+    assert text.startswith(head) and text.endswith(tail)
+    assert not head.endswith("wor") and tail.startswith("word")
@@ -0,0 +1,149 @@
+import asyncio
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core.semantic_cache import SemanticCache, get_semantic_cache
+from core.types import SemanticCacheSettings
+
+
+class FakeEmbedder:
+    """Returns fixed vectors so similarities are known in advance"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    async def embed(self, text, model=None):
+        return self.vectors.get(text)
+
+
+VECTORS = {
+    "how do i reset my password": [1.0, 0.0, 0.0],
+    "how can i reset my password": [0.99, 0.1, 0.0],
+    "what is the price": [0.0, 1.0, 0.0],
+    "where is the office": [0.0, 0.0, 1.0],
+}
+
+
+@pytest.fixture
+def embedder():
+    return FakeEmbedder(dict(VECTORS))
+
+
+@pytest.fixture
+def cache(embedder):
+    """In-memory cache"""
+    return SemanticCache(SemanticCacheSettings(cache_dir=""), embedder, "test", "prompt")
+
+
+@pytest.fixture
+def disk_settings(tmp_path):
+    return SemanticCacheSettings(cache_dir=str(tmp_path))
+
+
+def remember(cache: SemanticCache, question: str, reply: str) -> None:
+    reply_found, vector = asyncio.run(cache.lookup(question))
+    assert reply_found is None
+    cache.store(question, reply, vector)
+
+
+def test_search_returns_best_matches_first(cache):
+    for question in ("how do i reset my password", "what is the price", "where is the office"):
+        remember(cache, question, question.upper())
+
+    query = np.asarray([[0.2, 0.9, 0.1]], dtype=np.float32)
+    indices, scores = cache.search(query / np.linalg.norm(query), k=2)
+    assert indices.shape == (1, 2)
+    assert cache.questions[indices[0, 0]] == "what is the price"
+    assert scores[0, 0] > scores[0, 1]
+
+
+def test_similar_question_is_served_from_cache(cache):
+    remember(cache, "how do i reset my password", "Use the reset link")
+
+    reply, _ = asyncio.run(cache.lookup("how can i reset my password"))
+    assert reply == "Use the reset link"
+    reply, _ = asyncio.run(cache.lookup("what is the price"))
+    assert reply is None
+
+
+def test_least_recently_used_entry_is_evicted_when_full(embedder):
+    cache = SemanticCache(SemanticCacheSettings(cache_dir="", capacity=2), embedder, "test", "prompt")
+    remember(cache, "how do i reset my password", "reset")
+    remember(cache, "what is the price", "price")
+    cache.last_used[0] += 10  # The password answer was used more recently
+
+    remember(cache, "where is the office", "office")
+    assert sorted(q for q in cache.questions if q) == ["how do i reset my password", "where is the office"]
+
+
+def test_expired_entries_are_not_served(cache):
+    remember(cache, "how do i reset my password", "reset")
+    cache.created[:] -= cache.ttl + 1
+    assert asyncio.run(cache.lookup("how do i reset my password"))[0] is None
+    assert not cache.valid.any()
+
+
+def test_persistence_round_trip(embedder, disk_settings):
+    cache = SemanticCache(disk_settings, embedder, "test", "prompt")
+    remember(cache, "how do i reset my password", "Use the reset link")
+    cache.save()
+
+    restored = SemanticCache(disk_settings, embedder, "test", "prompt")
+    assert restored.dim == 3
+    assert asyncio.run(restored.lookup("how can i reset my password"))[0] == "Use the reset link"
+
+    # A different prompt invalidates what was persisted
+    assert SemanticCache(disk_settings, embedder, "test", "new prompt").valid.sum() == 0
+
+
+def test_background_save_writes_the_entries_as_of_the_snapshot(embedder, disk_settings):
+    cache = SemanticCache(disk_settings, embedder, "test", "prompt")
+    remember(cache, "how do i reset my password", "Use the reset link")
+    meta = cache._snapshot()
+    cache.clear()  # The loop keeps going while the thread writes
+    cache._write(meta, cache.vectors)
+
+    restored = SemanticCache(disk_settings, embedder, "test", "prompt")
+    assert asyncio.run(restored.lookup("how do i reset my password"))[0] == "Use the reset link"
+
+
+def test_entries_without_a_reply_are_not_loaded(embedder, disk_settings, tmp_path):
+    cache = SemanticCache(disk_settings, embedder, "test", "prompt")
+    remember(cache, "how do i reset my password", "Use the reset link")
+    cache.save()
+    meta_path = tmp_path / "test" / "meta.json"
+    meta = json.loads(meta_path.read_text())
+    meta["entries"]["0"]["reply"] = None
+    meta_path.write_text(json.dumps(meta))
+
+    restored = SemanticCache(disk_settings, embedder, "test", "prompt")
+    assert not restored.valid.any()
+
+
+def test_prompt_change_clears_entries(cache):
+    remember(cache, "how do i reset my password", "reset")
+    cache.invalidate("prompt")
+    assert cache.valid.sum() == 1
+    cache.invalidate("another prompt")
+    assert cache.valid.sum() == 0
+
+
+def test_embedding_dimension_change_reallocates(cache, embedder):
+    remember(cache, "how do i reset my password", "reset")
+
+    embedder.vectors = {"how do i reset my password": [1.0, 0.0, 0.0, 0.0, 0.0]}
+    remember(cache, "how do i reset my password", "reset again")
+    assert cache.dim == 5
+    assert cache.vectors.shape == (cache.capacity, 5)
+    assert asyncio.run(cache.lookup("how do i reset my password"))[0] == "reset again"
+
+
+def test_handlers_of_a_character_share_one_cache(embedder):
+    settings = SemanticCacheSettings(cache_dir="")
+    first = get_semantic_cache(settings, embedder, "test-shared", "prompt")
+    second = get_semantic_cache(settings, embedder, "test-shared", "prompt")
+    assert first is second
+    assert first.name == "test-shared"
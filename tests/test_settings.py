@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import pytest
+from dotenv import dotenv_values
+from pydantic import ValidationError
+
+from core.types import Settings
+
+ENV_EXAMPLE = Path(__file__).resolve().parent.parent / ".env.example"
+
+
+def test_defaults_without_environment():
+    settings = Settings.from_env({})
+    assert settings.enable_marketing is True
+    assert settings.memory.turns_per_chat == 20
+    assert settings.telegram.allowed_groups == []
+    assert settings.discord.token is None
+
+
+def test_values_are_read_into_their_groups():
+    settings = Settings.from_env({
+        "ENABLE_REPLIES": "false",
+        "MEMORY_TURNS_PER_CHAT": "7",
+        "MARKETING_COOLDOWN_HOURS": "2.5",
+        "OLLAMA_BASE_URL": "http://gpu:11434",
+    })
+    assert settings.enable_replies is False
+    assert settings.memory.turns_per_chat == 7
+    assert settings.marketing.cooldown_hours == 2.5
+    assert settings.ollama.base_url == "http://gpu:11434"
+
+
+def test_empty_values_fall_back_to_defaults():
+    settings = Settings.from_env({"MEMORY_TURNS_PER_CHAT": "", "DISCORD_TOKEN": ""})
+    assert settings.memory.turns_per_chat == 20
+    assert settings.discord.token is None
+
+
+def test_allowed_groups_are_split_and_trimmed():
+    settings = Settings.from_env({"TELEGRAM_ALLOWED_GROUPS": " -100123, mygroup ,,"})
+    assert settings.telegram.allowed_groups == ["-100123", "mygroup"]
+
+
+@pytest.mark.parametrize("environ", [
+    {"MEMORY_TURNS_PER_CHAT": "0"},
+    {"MEMORY_TURNS_PER_CHAT": "many"},
+    {"ENABLE_MARKETING": "sometimes"},
+])
+def test_invalid_values_are_rejected(environ):
+    with pytest.raises(ValidationError):
+        Settings.from_env(environ)
+
+
+def test_env_example_loads():
+    environ = {key: value for key, value in dotenv_values(ENV_EXAMPLE).items() if value is not None}
+    settings = Settings.from_env(environ)
+    # Placeholder credentials are only checked by the client that uses them
+    assert settings.telegram.api_id == "your_api_id"
+
+
+def test_settings_are_immutable():
+    settings = Settings.from_env({})
+    with pytest.raises(ValidationError):
+        settings.memory.turns_per_chat = 3
@@ -0,0 +1,61 @@
+import pytest
+from pydantic import ValidationError
+
+from core.metrics import metrics
+from core.types import GenerationResult, Settings
+from core.usage import UsageTracker
+
+
+@pytest.fixture
+def tracker():
+    return UsageTracker()
+
+
+def test_calls_are_totalled_per_character_model_and_call_type(tracker):
+    for _ in range(2):
+        tracker.record(GenerationResult(text="hi", provider="ollama", model="llama3", prompt_tokens=100,
+                                        completion_tokens=20, latency_seconds=1.0, eval_seconds=0.5), "alice", "reply")
+    tracker.record(GenerationResult(text="[INTERNAL] timeout", provider="ollama", model="llama3",
+                                    latency_seconds=3.0), "alice", "relevance")
+
+    reply = tracker.totals[("alice", "ollama", "llama3", "reply")]
+    assert (reply.calls, reply.errors, reply.prompt_tokens, reply.completion_tokens) == (2, 0, 200, 40)
+    assert reply.compute_seconds == 1.0
+    relevance = tracker.totals[("alice", "ollama", "llama3", "relevance")]
+    assert (relevance.calls, relevance.errors, relevance.prompt_tokens) == (1, 1, 0)
+
+
+def test_usage_is_mirrored_into_metrics(tracker):
+    labels = dict(character="bob", provider="gemini", model="gemini-pro", call_type="summary")
+    before = metrics.get_counter("llm_prompt_tokens_total", **labels)
+    tracker.record(GenerationResult(text="ok", provider="gemini", model="gemini-pro", prompt_tokens=7), "bob", "summary")
+    assert metrics.get_counter("llm_prompt_tokens_total", **labels) == before + 7
+
+
+def test_summary_includes_cost_for_priced_models(tracker):
+    tracker.record(GenerationResult(text="a", provider="gemini", model="priced", prompt_tokens=1_000_000,
+                                    completion_tokens=500_000, latency_seconds=2.0), "alice", "reply")
+    tracker.record(GenerationResult(text="b", provider="ollama", model="local", prompt_tokens=10,
+                                    latency_seconds=1.0), "alice", "reply")
+
+    lines = tracker.summary_lines({"priced": (0.5, 2.0)})
+    assert lines[0] == ("alice gemini/priced reply: 1 calls (0 failed), 1000000 prompt + 500000 completion tokens, "
+                        "avg latency 2.00s, $1.5000")
+    assert "$" not in lines[1]
+    assert lines[2] == "Estimated total cost: $1.5000"
+
+
+def test_summary_without_prices_has_no_cost(tracker):
+    tracker.record(GenerationResult(text="a", provider="ollama", model="local", prompt_tokens=10), "alice", "reply")
+    assert len(tracker.summary_lines()) == 1
+    assert UsageTracker().summary_lines() == []
+
+
+def test_usage_prices_are_parsed():
+    settings = Settings.from_env({"USAGE_PRICES": "gemini-pro=0.5/1.5, cheap=0.1,,"})
+    assert settings.usage.prices == {"gemini-pro": (0.5, 1.5), "cheap": (0.1, 0.1)}
+
+
+def test_malformed_usage_prices_are_rejected():
+    with pytest.raises(ValidationError):
+        Settings.from_env({"USAGE_PRICES": "gemini-pro=free"})